@@ -0,0 +1,241 @@
+"""Computer strategies that are smarter than random guessing.
+
+Strategies follow the interface used by simulation.py: they are created once
+per game with the Player they shoot for and a random number generator,
+next_shot() returns a cell id, and record() is told the result of
+Grid.is_hit for that shot.
+"""
+from functools import lru_cache
+
+from main import legal_placements
+from posterior import PosteriorEngine, position
+
+
+@lru_cache(maxsize=None)
+def placement_cells(size, ship_size):
+    """Returns, for every placement in legal_placements(size, ship_size), the
+    tuple of cells it covers, and for every cell the tuple of placements
+    covering it.
+    """
+    step = {"h": 1, "v": size}
+    cells = tuple(tuple(start + i * step[direction] for i in range(ship_size))
+                  for _, start, direction in legal_placements(size, ship_size))
+    covering = [[] for _ in range(size * size)]
+    for placement, placement_cells_ in enumerate(cells):
+        for cell in placement_cells_:
+            covering[cell].append(placement)
+    return cells, tuple(tuple(placements) for placements in covering)
+
+
+def sunk_cells(cell, ship_size, open_hits, size):
+    """Guesses which open hits made up the ship of ship_size just sunk at
+    cell: a straight run of ship_size open hits containing cell, preferring
+    one that ends at cell.
+
+    :param open_hits: Set of hit cells not yet attributed to a sunk ship.
+    """
+    row, col = divmod(cell, size)
+    windows = []
+    for step, position in ((1, col), (size, row)):
+        # Extend the run of open hits through cell in both directions
+        before = 0
+        while position - before > 0 and \
+                cell - (before + 1) * step in open_hits:
+            before += 1
+        after = 0
+        while position + after < size - 1 and \
+                cell + (after + 1) * step in open_hits:
+            after += 1
+        for first in range(-min(before, ship_size - 1), 1):
+            if first + ship_size - 1 <= after:
+                windows.append([cell + (first + i) * step
+                                for i in range(ship_size)])
+    if not windows:
+        return [cell]
+    for window in windows:
+        if window[0] == cell or window[-1] == cell:
+            return window
+    return windows[0]
+
+
+class DensityStrategy:
+    """Hunt/target guesser driven by a probability density.
+
+    Every cell is scored by how many placements of the ships still afloat
+    could cover it. Placements crossing a miss or a sunk ship are ruled out
+    as results come in, and only the scores of the cells they cover are
+    updated, so the density is never rebuilt from scratch.
+
+    While there are hits that do not belong to a sunk ship (target mode),
+    only placements through those hits are scored, weighted by how many of
+    them they explain.
+
+    Per-game state is slotted, since a server keeps a strategy for every
+    match it holds, and the untried list shares its ints with the board's
+    BoardConfig; the placement tables are shared between games.
+    """
+    __slots__ = ("rng", "size", "remaining", "cells", "covering", "alive",
+                 "density", "untried", "open_hits")
+
+    def __init__(self, player, rng):
+        self.rng = rng
+        self.size = player.grid.size
+
+        self.remaining = {}
+        # Ship size -> number of ships of that size still afloat
+        for ship_size in player.grid.config.fleet:
+            self.remaining[ship_size] = self.remaining.get(ship_size, 0) + 1
+        self.cells = {}
+        self.covering = {}
+        self.alive = {}
+        # Ship size -> 1/0 per placement, whether it is still possible
+        for ship_size in self.remaining:
+            cells, covering = placement_cells(self.size, ship_size)
+            self.cells[ship_size] = cells
+            self.covering[ship_size] = covering
+            self.alive[ship_size] = bytearray(b"\x01" * len(cells))
+
+        self.density = [0] * (self.size * self.size)
+        for ship_size, count in self.remaining.items():
+            for cells in self.cells[ship_size]:
+                for cell in cells:
+                    self.density[cell] += count
+        # Kept as a list: it is updated on every shot, and an array would
+        # box each score it hands out
+
+        self.untried = list(player.grid.config.all_cells)
+        # Cells not shot at yet, in increasing order
+        self.open_hits = set()
+        # Hit cells not yet attributed to a sunk ship
+
+    def scores(self):
+        """Returns the score of every cell that next_shot picks the best
+        untried cell by: the target scores while there are open hits that
+        live placements explain, else the density
+        """
+        if self.open_hits:
+            target_scores = self.__target_scores()
+            # Hits that no live placement explains fall back to hunting
+            if any(target_scores[cell] for cell in self.untried):
+                return target_scores
+        return self.density
+
+    def next_shot(self):
+        scores = self.scores()
+        best = max(scores[cell] for cell in self.untried)
+        choices = [cell for cell in self.untried if scores[cell] == best]
+        return self.rng.choice(choices) if len(choices) > 1 else choices[0]
+
+    def record(self, cell, result):
+        if cell in self.untried:
+            self.untried.remove(cell)
+        if result is None:
+            self.__block(cell)
+            return
+        self.open_hits.add(cell)
+        if result != 0:
+            for sunk_cell in sunk_cells(cell, result, self.open_hits,
+                                        self.size):
+                self.open_hits.discard(sunk_cell)
+                self.__block(sunk_cell)
+            self.__retire(result)
+
+    def __block(self, cell):
+        """Rules out every placement covering cell"""
+        density = self.density
+        for ship_size, covering in self.covering.items():
+            alive = self.alive[ship_size]
+            count = self.remaining[ship_size]
+            cells = self.cells[ship_size]
+            for placement in covering[cell]:
+                if alive[placement]:
+                    alive[placement] = 0
+                    if count:
+                        for covered in cells[placement]:
+                            density[covered] -= count
+
+    def __retire(self, ship_size):
+        """Removes one ship of ship_size from the ships still afloat"""
+        if not self.remaining.get(ship_size):
+            return
+        self.remaining[ship_size] -= 1
+        density = self.density
+        alive = self.alive[ship_size]
+        for placement, cells in enumerate(self.cells[ship_size]):
+            if alive[placement]:
+                for cell in cells:
+                    density[cell] -= 1
+
+    def __target_scores(self):
+        """Scores untried cells by the live placements through open hits"""
+        scores = [0] * (self.size * self.size)
+        open_hits = self.open_hits
+        for ship_size, count in self.remaining.items():
+            if not count:
+                continue
+            alive = self.alive[ship_size]
+            cells = self.cells[ship_size]
+            seen = set()
+            for hit in open_hits:
+                for placement in self.covering[ship_size][hit]:
+                    if not alive[placement] or placement in seen:
+                        continue
+                    seen.add(placement)
+                    covered = cells[placement]
+                    weight = count * sum(1 for c in covered if c in open_hits)
+                    weight *= weight  # strongly favour lines of hits
+                    for c in covered:
+                        scores[c] += weight
+        return scores
+
+
+class PosteriorStrategy:
+    """Shoots the untried cell most likely to hold a ship, as computed by
+    posterior.PosteriorEngine from the hits, misses and sunk ships so far.
+
+    Unlike DensityStrategy it accounts for how the remaining ships constrain
+    each other, but each move costs a posterior computation rather than an
+    incremental update.
+    """
+    __slots__ = ("rng", "size", "remaining", "untried", "open_hits",
+                 "misses", "sunk", "engine")
+
+    def __init__(self, player, rng, samples=500):
+        self.rng = rng
+        self.size = player.grid.size
+        self.remaining = list(player.grid.config.fleet)
+        # Lengths of the ships still afloat
+        self.untried = list(player.grid.config.all_cells)
+        # Cells not shot at yet, in increasing order
+        self.open_hits = set()
+        # Hit cells not yet attributed to a sunk ship
+        self.misses = 0
+        self.sunk = 0
+        # Cell masks of the misses and of the cells of sunk ships
+        self.engine = PosteriorEngine(samples, seed=rng.getrandbits(64))
+
+    def next_shot(self):
+        hits = 0
+        for cell in self.open_hits:
+            hits |= 1 << cell
+        probabilities = self.engine.probabilities(
+            position(self.size, self.remaining, hits, self.misses, self.sunk))
+        best = max(probabilities[cell] for cell in self.untried)
+        choices = [cell for cell in self.untried
+                   if probabilities[cell] == best]
+        return self.rng.choice(choices) if len(choices) > 1 else choices[0]
+
+    def record(self, cell, result):
+        if cell in self.untried:
+            self.untried.remove(cell)
+        if result is None:
+            self.misses |= 1 << cell
+            return
+        self.open_hits.add(cell)
+        if result != 0:
+            for sunk_cell in sunk_cells(cell, result, self.open_hits,
+                                        self.size):
+                self.open_hits.discard(sunk_cell)
+                self.sunk |= 1 << sunk_cell
+            if result in self.remaining:
+                self.remaining.remove(result)
@@ -0,0 +1,202 @@
+"""Vectorized batch simulator that plays thousands of games in lockstep.
+
+Boards for many games are held as NumPy arrays of shape (games, size, size)
+and every game fires one shot per step, with hit detection and sink
+accounting done for all games at once. Shots are uniformly random, like the
+random guesser in simulation.py. Requires numpy.
+
+Usage:
+    python batch.py --games 100000 --difficulty hard --seed 1
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ai import placement_cells
+from main import FLEET_TRIES, board_config
+from simulation import parse_board
+
+
+class BoardBatch:
+    """A batch of boards, one per game, each with a randomly placed fleet.
+
+    - ship_id: (games, size, size), 1 + index into the fleet of the ship on
+      each cell, or 0 for water
+    - hits, misses: (games, size, size) booleans of cells already shot
+    - ships_left: (games, ships) unhit cells left on each ship
+    - cells_left: (games,) unhit ship cells left on each board
+    """
+    def __init__(self, games, size, fleet, rng):
+        """
+        :param fleet: List of ship sizes, e.g. [2, 3, 3, 4, 5]
+        :param rng: numpy.random.Generator used to place the fleets
+        """
+        self.games = games
+        self.size = size
+        self.ship_sizes = np.array(fleet, dtype=np.int16)
+        self.ship_id = np.zeros((games, size, size),
+                                dtype=np.uint8 if len(fleet) < 255
+                                else np.uint16)
+        # One byte per cell unless the fleet has 255 ships or more, as in
+        # Grid
+        self.hits = np.zeros((games, size, size), dtype=bool)
+        self.misses = np.zeros((games, size, size), dtype=bool)
+        self.ships_left = np.tile(self.ship_sizes, (games, 1))
+        self.cells_left = np.full(games, sum(fleet), dtype=np.int32)
+        self.__place_fleets(rng)
+
+    def __place_fleets(self, rng):
+        """Places every ship on every board, each drawn uniformly from the
+        placements that do not overlap ships already on that board. Boards
+        where a ship no longer fits start their fleet over, up to
+        FLEET_TRIES times, like Grid.place_random_fleet. Raises ValueError
+        if some fleet could not be packed.
+        """
+        games, size = self.games, self.size
+        ship_id = self.ship_id.reshape(games, size * size)
+        pending = np.arange(games)
+        for _ in range(FLEET_TRIES):
+            boards = np.zeros((len(pending), size * size),
+                              dtype=ship_id.dtype)
+            stuck = self.__place_fleet(boards, rng)
+            ship_id[pending] = boards
+            if not stuck.any():
+                return
+            pending = pending[stuck]
+        raise ValueError("Could not fit the fleet %s on a %dx%d board"
+                         % (self.ship_sizes.tolist(), size, size))
+
+    def __place_fleet(self, boards, rng):
+        """Places the fleet on each of boards, (games, cells) ship ids of
+        empty boards. Returns a boolean array of the boards where some ship
+        had no room left; their ship ids are not valid.
+        """
+        size = self.size
+        everyone = np.arange(len(boards))[:, None]
+        stuck = np.zeros(len(boards), dtype=bool)
+        for ship, ship_size in enumerate(self.ship_sizes):
+            cells = np.array(placement_cells(size, int(ship_size))[0])
+            covers = np.zeros((len(cells), size * size), dtype=np.float32)
+            covers[np.arange(len(cells))[:, None], cells] = 1
+            # Number of occupied cells each placement would cover, per board
+            overlap = (boards > 0).astype(np.float32) @ covers.T
+            # argmax of random keys over the legal placements is a uniform
+            # draw from them
+            keys = rng.random(overlap.shape)
+            keys[overlap > 0] = -1
+            stuck |= (overlap > 0).all(axis=1)
+            chosen = keys.argmax(axis=1)
+            boards[everyone, cells[chosen]] = ship + 1
+        return stuck
+
+    def fire(self, games, cells):
+        """Fires one shot at each of the given games, at the given flat cell
+        (row * size + col). Returns an array with, per shot, the result of
+        Grid.is_hit with -1 standing in for None: -1 for a miss, 0 for a hit,
+        the ship size if it sank a ship.
+        """
+        size = self.size
+        ship_id = self.ship_id.reshape(self.games, size * size)
+        hits = self.hits.reshape(self.games, size * size)
+        misses = self.misses.reshape(self.games, size * size)
+
+        ids = ship_id[games, cells]
+        hit = ids > 0
+        hits[games[hit], cells[hit]] = True
+        misses[games[~hit], cells[~hit]] = True
+
+        # A game takes a single shot per step, so there are no repeated
+        # indices and plain fancy-index arithmetic is safe
+        hit_games = games[hit]
+        hit_ships = ids[hit].astype(np.intp) - 1
+        self.ships_left[hit_games, hit_ships] -= 1
+        self.cells_left[hit_games] -= 1
+
+        result = np.full(len(games), -1, dtype=np.int8)
+        result[hit] = 0
+        sunk = self.ships_left[hit_games, hit_ships] == 0
+        result[np.flatnonzero(hit)[sunk]] = self.ship_sizes[hit_ships[sunk]]
+        return result
+
+
+def random_shots_to_win(board, rng):
+    """Shoots every board in the batch with uniformly random, never repeated
+    shots until its fleet is sunk. Returns the number of shots each game took.
+    """
+    games, cells = board.games, board.size * board.size
+    # A random permutation of the cells per game gives its shot order
+    order = np.argsort(rng.random((games, cells)), axis=1)
+    shots = np.zeros(games, dtype=np.int32)
+    active = np.arange(games)
+    step = 0
+    while len(active):
+        board.fire(active, order[active, step])
+        step += 1
+        shots[active] = step
+        active = active[board.cells_left[active] > 0]
+    return shots
+
+
+def simulate_batch(n_games, difficulty="easy", seed=None, chunk=10000):
+    """Plays n_games random-vs-random games and returns (winner, shots_a,
+    shots_b) arrays with the same meaning as the GameResult fields in
+    simulation.py; winner is True where player a won.
+
+    Games are played chunk at a time to bound memory use.
+    """
+    rng = np.random.default_rng(seed)
+    config = board_config(difficulty)
+    size, fleet = config.size, list(config.fleet)
+
+    winners, shots_a, shots_b = [], [], []
+    for start in range(0, n_games, chunk):
+        games = min(chunk, n_games - start)
+        # Player a shoots at board b and player b at board a
+        needed_a = random_shots_to_win(BoardBatch(games, size, fleet, rng),
+                                       rng)
+        needed_b = random_shots_to_win(BoardBatch(games, size, fleet, rng),
+                                       rng)
+        # Player a shoots first, so wins ties
+        a_wins = needed_a <= needed_b
+        winners.append(a_wins)
+        shots_a.append(np.where(a_wins, needed_a, needed_b))
+        shots_b.append(np.where(a_wins, needed_a - 1, needed_b))
+    return (np.concatenate(winners), np.concatenate(shots_a),
+            np.concatenate(shots_b))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run batched random games.")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--difficulty", action="append",
+                        help="easy, medium, hard or a custom size such as "
+                             "30x30; may be repeated (default: all three "
+                             "difficulty levels)")
+    parser.add_argument("--fleet", default=None,
+                        help="Comma-separated ship lengths (default: "
+                             "2,3,3,4,5)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    try:
+        configs = [parse_board(difficulty, args.fleet) for difficulty
+                   in args.difficulty or ["easy", "medium", "hard"]]
+    except ValueError as error:
+        parser.error(str(error))
+    for config in configs:
+        start = time.perf_counter()
+        winner, shots_a, shots_b = simulate_batch(args.games, config,
+                                                  args.seed)
+        elapsed = time.perf_counter() - start
+        game_length = np.where(winner, shots_a, shots_b)
+        print(config.name.capitalize() + ":")
+        print("  Player a win rate: %.3f" % winner.mean())
+        print("  Shots to win: mean %.2f, p5 %d, p50 %d, p95 %d"
+              % ((game_length.mean(),)
+                 + tuple(np.percentile(game_length, [5, 50, 95]).astype(int))))
+        print("  Games per second: %.0f" % (args.games / elapsed))
+
+
+if __name__ == '__main__':
+    main()
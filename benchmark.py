@@ -0,0 +1,432 @@
+"""Benchmark suite for grid setup, ship placement, shot resolution, search
+state, rendering, AI move selection and whole games.
+
+Every benchmark runs with fixed seeds for each difficulty level (plus larger
+custom boards) and reports the best time per operation over several repeats.
+Results can be written as JSON and compared against a saved baseline to flag
+regressions.
+
+With --memory, the suite also reports the memory held by one resident match,
+as the server keeps it between turns, which is what bounds the number of idle
+games a process can hold.
+
+Usage:
+    python benchmark.py --json baseline.json
+    python benchmark.py --baseline baseline.json --threshold 0.1
+    python benchmark.py --memory construct_grid
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from ai import DensityStrategy
+from fleets import FleetSampler
+from gamestate import GameState
+from main import (Game, Grid, Player, board_config, display_grids,
+                  place_ship)
+from simulation import RandomStrategy, parse_board, play_game
+
+SEED = 1234
+DIFFICULTIES = ["easy", "medium", "hard", "30x30"]
+
+# Shots fired by each side of the matches measured by match_memory
+MATCH_SHOTS = 20
+
+# name -> function(difficulty) returning (setup, run). setup() builds fresh
+# state outside the timed region; run(state) is timed and returns the number
+# of operations it performed.
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Registers a benchmark function under name"""
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def fleet_grid(difficulty, rng):
+    """Returns a silent grid with a randomly placed fleet"""
+    return Grid(difficulty, verbose=False).place_random_fleet(rng)
+
+
+def all_coords(grid):
+    return [(row, letter) for row in grid.rows for letter in grid.cols]
+
+
+def all_cells(grid):
+    return list(range(grid.config.cells))
+
+
+@benchmark("construct_grid")
+def bench_construct_grid(difficulty):
+    def run(state):
+        Grid(difficulty, verbose=False)
+        return 1
+    return lambda: None, run
+
+
+@benchmark("place_fleet")
+def bench_place_fleet(difficulty):
+    rng = random.Random(SEED)
+
+    def run(grid):
+        for ship_type in grid.config.ship_types:
+            place_ship(ship_type, grid, "computer_player", difficulty, rng)
+        return len(grid.config.ship_types)
+    return lambda: Grid(difficulty, verbose=False), run
+
+
+@benchmark("place_ship")
+def bench_place_ship(difficulty):
+    def setup():
+        grid = Grid(difficulty, verbose=False)
+        return grid, [(coord, direction) for coord in all_coords(grid)
+                      for direction in "hv"]
+
+    def run(state):
+        # Tries every coordinate and direction, so both accepted and rejected
+        # placements are timed
+        grid, attempts = state
+        for coord, direction in attempts:
+            grid.place_ship(3, coord, direction)
+        return len(attempts)
+    return setup, run
+
+
+@benchmark("sample_fleet")
+def bench_sample_fleet(difficulty):
+    sampler = FleetSampler(difficulty, seed=SEED)
+
+    def run(state):
+        for _ in range(100):
+            sampler.sample()
+        return 100
+    return lambda: None, run
+
+
+@benchmark("is_hit")
+def bench_is_hit(difficulty):
+    rng = random.Random(SEED)
+
+    def setup():
+        grid = fleet_grid(difficulty, rng)
+        return grid, all_cells(grid)
+
+    def run(state):
+        grid, shots = state
+        for cell in shots:
+            grid.is_hit(cell, "computer_player")
+        return len(shots)
+    return setup, run
+
+
+@benchmark("apply_undo_shot")
+def bench_apply_undo_shot(difficulty):
+    rng = random.Random(SEED)
+
+    def setup():
+        grid = fleet_grid(difficulty, rng)
+        shots = all_cells(grid)
+        rng.shuffle(shots)
+        return GameState.from_grid(grid, ()), shots
+
+    def run(state):
+        # Plays out the whole board and takes every shot back, as a search
+        # does along one line
+        game_state, shots = state
+        for cell in shots:
+            game_state.apply_shot(cell)
+        for _ in shots:
+            game_state.undo_shot()
+        return len(shots)
+    return setup, run
+
+
+@benchmark("clone_state")
+def bench_clone_state(difficulty):
+    rng = random.Random(SEED)
+
+    def setup():
+        grid = fleet_grid(difficulty, rng)
+        shots = all_cells(grid)
+        rng.shuffle(shots)
+        half = len(shots) // 2
+        return GameState.from_grid(grid, shots[:half]), shots[half:]
+
+    def run(state):
+        # One clone per candidate shot from a mid-game position, each
+        # trying its shot
+        game_state, candidates = state
+        for cell in candidates:
+            game_state.clone().apply_shot(cell)
+        return len(candidates)
+    return setup, run
+
+
+@benchmark("mark_hit_or_miss")
+def bench_mark_hit_or_miss(difficulty):
+    def setup():
+        grid = Grid(difficulty, verbose=False)
+        return grid, all_cells(grid)
+
+    def run(state):
+        grid, shots = state
+        for i, cell in enumerate(shots):
+            grid.mark_hit_or_miss(cell, 0 if i % 3 else None,
+                                  "computer_player")
+        return len(shots)
+    return setup, run
+
+
+@benchmark("print_grid")
+def bench_print_grid(difficulty):
+    rng = random.Random(SEED)
+
+    def setup():
+        grid = fleet_grid(difficulty, rng)
+        for cell in all_cells(grid)[::3]:
+            grid.mark_hit_or_miss(cell, grid.is_hit(cell, "computer_player"),
+                                  "computer_player")
+        return grid
+
+    def run(grid):
+        with contextlib.redirect_stdout(io.StringIO()):
+            grid.print_grid()
+        return 1
+    return setup, run
+
+
+@benchmark("display_turn")
+def bench_display_turn(difficulty):
+    rng = random.Random(SEED)
+
+    def setup():
+        grid = fleet_grid(difficulty, rng)
+        target = Grid(difficulty, verbose=False)
+        shots = all_cells(grid)
+        rng.shuffle(shots)
+        return grid, target, shots[:20]
+
+    def run(state):
+        # One shot on each board, then both boards are redrawn, as after
+        # every turn of the console game
+        grid, target, shots = state
+        with contextlib.redirect_stdout(io.StringIO()):
+            for cell in shots:
+                grid.mark_hit_or_miss(cell, grid.is_hit(cell, "human_player"),
+                                      "human_player")
+                target.mark_hit_or_miss(cell, None, "computer_player")
+                display_grids(grid, target)
+        return len(shots)
+    return setup, run
+
+
+@benchmark("ai_move")
+def bench_ai_move(difficulty):
+    rng = random.Random(SEED)
+
+    def setup():
+        target = fleet_grid(difficulty, rng)
+        player = Player(Grid(difficulty, verbose=False))
+        return target, DensityStrategy(player, random.Random(SEED))
+
+    def run(state):
+        # One density-AI move (next_shot + record) per shot until sunk
+        target, strategy = state
+        moves = 0
+        while target.ships_left:
+            cell = strategy.next_shot()
+            strategy.record(cell, target.is_hit(cell, "computer_player"))
+            moves += 1
+        return moves
+    return setup, run
+
+
+@benchmark("game_random")
+def bench_game_random(difficulty):
+    seeds = iter(range(SEED, sys.maxsize))
+
+    def run(seed):
+        play_game(RandomStrategy, RandomStrategy, difficulty, seed)
+        return 1
+    return lambda: next(seeds), run
+
+
+@benchmark("game_density")
+def bench_game_density(difficulty):
+    seeds = iter(range(SEED, sys.maxsize))
+
+    def run(seed):
+        play_game(DensityStrategy, DensityStrategy, difficulty, seed)
+        return 1
+    return lambda: next(seeds), run
+
+
+def measure(setup, run, number, repeat):
+    """Returns the best time per operation, in microseconds"""
+    best = None
+    for _ in range(repeat):
+        states = [setup() for _ in range(number)]
+        ops = 0
+        start = time.perf_counter()
+        for state in states:
+            ops += run(state)
+        elapsed = time.perf_counter() - start
+        per_op = elapsed / ops * 1e6
+        if best is None or per_op < best:
+            best = per_op
+    return best
+
+
+def resident_match(difficulty, rng, shots=MATCH_SHOTS):
+    """Returns the objects a server holds for a match against the computer
+    after each side has fired shots shots: both fleets, their players, the
+    Game and the computer's DensityStrategy. The human side shoots at random.
+
+    :param difficulty: Difficulty name or custom size, looked up with
+        board_config for every match the way the server's PLAY does.
+    """
+    config = board_config(difficulty)
+    grids = [fleet_grid(config, rng) for _ in range(2)]
+    human, computer = Player(grids[0]), Player(grids[1])
+    game = Game(human, computer, verbose=False)
+    strategy = DensityStrategy(computer, rng)
+    for _ in range(shots):
+        cell = rng.randrange(config.cells)
+        while human.guessed[cell]:
+            cell = rng.randrange(config.cells)
+        human.guess_coord(cell)
+        is_hit = grids[1].is_hit(cell, "computer_player")
+        grids[1].mark_hit_or_miss(cell, is_hit, "computer_player")
+
+        cell = strategy.next_shot()
+        computer.guess_coord(cell)
+        is_hit = grids[0].is_hit(cell, "human_player")
+        grids[0].mark_hit_or_miss(cell, is_hit, "human_player")
+        strategy.record(cell, is_hit)
+    return game, strategy
+
+
+def match_memory(difficulty, matches=200):
+    """Returns the bytes allocated per resident match, averaged over matches
+    matches held at once. Tables shared between matches of the same board are
+    built by a first match beforehand and not counted, so a board config
+    that is not shared between matches shows up here.
+    """
+    rng = random.Random(SEED)
+    resident_match(difficulty, rng)
+    tracemalloc.start()
+    try:
+        held = [resident_match(difficulty, rng) for _ in range(matches)]
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del held
+    return allocated / matches
+
+
+def run_benchmarks(names=None, difficulties=DIFFICULTIES, number=50,
+                   repeat=5):
+    """Runs the selected benchmarks and returns a dict mapping
+    "difficulty/benchmark" to microseconds per operation.
+    """
+    results = {}
+    for difficulty in difficulties:
+        config = parse_board(difficulty)
+        for name, function in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            setup, run = function(config)
+            results[config.name + "/" + name] = measure(setup, run, number,
+                                                        repeat)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns the (key, baseline, current) entries that are more than
+    threshold (e.g. 0.1 for 10%) slower than the baseline.
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous and current > previous * (1 + threshold):
+            regressions.append((key, previous, current))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("benchmarks", nargs="*",
+                        help="Benchmarks to run (default: all): "
+                             + ", ".join(BENCHMARKS))
+    parser.add_argument("--difficulty", action="append",
+                        help="Difficulty level or custom size such as 30x30; "
+                             "may be repeated (default: "
+                             + ", ".join(DIFFICULTIES) + ")")
+    parser.add_argument("--number", type=int, default=50,
+                        help="Operations batches per repeat")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Slowdown or growth that counts as a regression")
+    parser.add_argument("--memory", action="store_true",
+                        help="Also measure the memory of a resident match")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: " + ", ".join(sorted(unknown)))
+    for difficulty in args.difficulty or []:
+        try:
+            parse_board(difficulty)
+        except ValueError as error:
+            parser.error(str(error))
+
+    results = run_benchmarks(args.benchmarks, args.difficulty or DIFFICULTIES,
+                             args.number, args.repeat)
+    for key, per_op in results.items():
+        print("%-32s %12.3f us/op" % (key, per_op))
+
+    memory = {}
+    if args.memory:
+        for difficulty in args.difficulty or DIFFICULTIES:
+            memory[parse_board(difficulty).name + "/match"] = \
+                match_memory(difficulty)
+        for key, size in memory.items():
+            print("%-32s %12.0f bytes (%d matches/GiB)"
+                  % (key, size, 2 ** 30 // size))
+
+    if args.json:
+        report = {"python": platform.python_version(), "seed": SEED,
+                  "results": results}
+        if memory:
+            report["memory"] = memory
+        with open(args.json, "w") as out:
+            json.dump(report, out, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline["results"], args.threshold)
+        for key, previous, current in regressions:
+            print("REGRESSION %s: %.3f -> %.3f us/op (%+.0f%%)"
+                  % (key, previous, current, (current / previous - 1) * 100))
+        memory_regressions = compare(memory, baseline.get("memory", {}),
+                                     args.threshold)
+        for key, previous, current in memory_regressions:
+            print("REGRESSION %s: %.0f -> %.0f bytes (%+.0f%%)"
+                  % (key, previous, current, (current / previous - 1) * 100))
+        if regressions or memory_regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
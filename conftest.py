@@ -0,0 +1,3 @@
+"""Lets the tests under tests/ import the top-level modules when run with a
+bare pytest command
+"""
@@ -0,0 +1,268 @@
+"""Fast sampler of random fleet layouts, for datasets and probability tables.
+
+Fleets are drawn from the precomputed placement tables of main.py
+(legal_placements) and checked with bitmasks, with no Grid involved. Two
+distributions are available:
+    - uniform: every valid layout of the fleet is equally likely. Each ship
+      takes a placement drawn from all of its in-bounds placements, and the
+      draw starts over at the first overlap, so accepted fleets are uniform.
+    - sequential: ships are placed in fleet order, each uniformly among the
+      placements that are still free, the way Grid.place_random_ship (and so
+      the computer player) places them. A ship that no longer fits sends the
+      sampler back to redraw the ship before it.
+
+A fleet that cannot be packed raises ValueError, like
+Grid.place_random_fleet: sequential sampling gives up after FLEET_TRIES
+dead ends, and uniform sampling checks the fleet with a sequential draw once
+FLEET_TRIES draws in a row have failed.
+
+FleetSampler yields fleets one at a time as tuples of (first cell, ship size,
+direction) placements, like Grid.placements, and with numpy installed also
+fills whole arrays at once.
+
+Usage:
+    python fleets.py --fleets 1000000 --difficulty hard --seed 1 --numpy
+"""
+import argparse
+import random
+import time
+
+from main import FLEET_TRIES, Grid, board_config, legal_placements
+from simulation import add_board_arguments, parse_board
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for sample_array and boards
+    np = None
+
+UNIFORM, SEQUENTIAL = "uniform", "sequential"
+
+# Tries at drawing a free placement of a ship before listing the free ones
+SEQUENTIAL_TRIES = 16
+
+
+def placement_code(start, direction):
+    """Packs a placement as in gamelog.py: first cell << 1 | 1 if vertical"""
+    return start << 1 | (direction == "v")
+
+
+def place_fleet(grid, placements):
+    """Places sampled placements on a grid and returns it"""
+    for start, ship_size, direction in placements:
+        grid.place_ship_at(ship_size, start, direction)
+    return grid
+
+
+class FleetSampler:
+    """Iterator over random fleets for a board.
+
+    :param difficulty: Difficulty name, custom size such as "30x30", or
+        BoardConfig.
+    :param method: UNIFORM or SEQUENTIAL.
+    :param seed: Seed for both the Python and the numpy generators, so the
+        same seed always gives the same fleets.
+    """
+    def __init__(self, difficulty, method=UNIFORM, seed=None):
+        if method not in (UNIFORM, SEQUENTIAL):
+            raise ValueError("Unknown sampling method: " + str(method))
+        self.config = board_config(difficulty)
+        self.method = method
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed) if np is not None else None
+        size = self.config.size
+        self.fleet = self.config.fleet
+        self.tables = [legal_placements(size, ship_size)
+                       for ship_size in self.fleet]
+        self.order = sorted(range(len(self.fleet)),
+                            key=lambda ship: -self.fleet[ship])
+        # Uniform draws try the longest ships first: they collide the most,
+        # so doomed fleets are abandoned sooner
+        self.acceptance = 0.5
+        # Running estimate of the share of uniform draws without overlap,
+        # used to size numpy batches
+        self.packable = False
+        # True once a sequential draw has shown that the fleet fits
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.sample()
+
+    def sample(self):
+        """Returns one fleet as a tuple of (first cell, ship size, direction)
+        placements, in fleet order
+        """
+        if self.method == UNIFORM:
+            return self.__uniform()
+        return self.__sequential()
+
+    def samples(self, n):
+        """Yields n fleets"""
+        for _ in range(n):
+            yield self.sample()
+
+    def __uniform(self):
+        random_ = self.rng.random
+        tables = self.tables
+        chosen = [None] * len(tables)
+        tries = 0
+        while True:
+            tries += 1
+            if tries == FLEET_TRIES:
+                self.__check_packable()
+            occupied = 0
+            for ship in self.order:
+                table = tables[ship]
+                placement = table[int(random_() * len(table))]
+                if placement[0] & occupied:
+                    break
+                occupied |= placement[0]
+                chosen[ship] = placement
+            else:
+                return tuple((start, ship_size, direction) for
+                             (_, start, direction), ship_size
+                             in zip(chosen, self.fleet))
+
+    def __sequential(self, rng=None):
+        random_ = (rng or self.rng).random
+        tables = self.tables
+        chosen = []
+        occupied = [0]
+        dead_ends = 0
+        # occupied[i] is the mask of the first i ships
+        while len(chosen) < len(tables):
+            table = tables[len(chosen)]
+            taken = occupied[-1]
+            placement = None
+            for _ in range(SEQUENTIAL_TRIES):
+                candidate = table[int(random_() * len(table))]
+                if not candidate[0] & taken:
+                    placement = candidate
+                    break
+            else:
+                free = [candidate for candidate in table
+                        if not candidate[0] & taken]
+                if free:
+                    placement = free[int(random_() * len(free))]
+            if placement is None:
+                # Dead end: redraw the previous ship
+                dead_ends += 1
+                if dead_ends == FLEET_TRIES:
+                    raise ValueError(
+                        "Could not fit the fleet %s on a %dx%d board"
+                        % (list(self.fleet), self.config.size,
+                           self.config.size))
+                chosen.pop()
+                occupied.pop()
+                continue
+            chosen.append(placement)
+            occupied.append(taken | placement[0])
+        return tuple((start, ship_size, direction) for
+                     (_, start, direction), ship_size
+                     in zip(chosen, self.fleet))
+
+    def __check_packable(self):
+        """Raises ValueError unless a sequential draw can pack the fleet.
+        The draw uses its own generator, so the sampled fleets do not depend
+        on whether the check ran.
+        """
+        if not self.packable:
+            self.__sequential(random.Random(0))
+            self.packable = True
+
+    def sample_array(self, n):
+        """Returns an (n, ships) uint16 array of uniformly random fleets, each
+        placement packed by placement_code. Requires numpy; always uniform.
+        """
+        if np is None:
+            raise ImportError("sample_array requires numpy")
+        size = self.config.size
+        cells = []
+        codes = []
+        for table, ship_size in zip(self.tables, self.fleet):
+            step = {"h": 1, "v": size}
+            cells.append(np.array([[start + i * step[direction]
+                                    for i in range(ship_size)]
+                                   for _, start, direction in table],
+                                  dtype=np.int32))
+            codes.append(np.array([placement_code(start, direction)
+                                   for _, start, direction in table],
+                                  dtype=np.uint16))
+
+        out = np.empty((n, len(self.fleet)), dtype=np.uint16)
+        filled = 0
+        while filled < n:
+            batch = int((n - filled) / self.acceptance * 1.1) + 64
+            picks = [self.np_rng.integers(0, len(table), batch)
+                     for table in self.tables]
+            covered = np.concatenate([ship_cells[pick] for ship_cells, pick
+                                      in zip(cells, picks)], axis=1)
+            covered.sort(axis=1)
+            valid = (np.diff(covered, axis=1) != 0).all(axis=1)
+            accepted = np.flatnonzero(valid)[:n - filled]
+            if not len(accepted):
+                self.__check_packable()
+            self.acceptance = max(valid.mean(), 0.01)
+            for ship, (ship_codes, pick) in enumerate(zip(codes, picks)):
+                out[filled:filled + len(accepted), ship] = \
+                    ship_codes[pick[accepted]]
+            filled += len(accepted)
+        return out
+
+    def boards(self, fleets):
+        """Expands an array from sample_array into an (n, size, size) int16
+        array with 1 + the fleet index of the ship on each cell, 0 for water
+        """
+        if np is None:
+            raise ImportError("boards requires numpy")
+        size = self.config.size
+        fleets = np.asarray(fleets)
+        boards = np.zeros((len(fleets), size * size), dtype=np.int16)
+        rows = np.arange(len(fleets))[:, None]
+        for ship, ship_size in enumerate(self.fleet):
+            start = (fleets[:, ship] >> 1).astype(np.int32)
+            step = np.where(fleets[:, ship] & 1, size, 1)
+            cells = start[:, None] + step[:, None] * np.arange(ship_size)
+            boards[rows, cells] = ship + 1
+        return boards.reshape(len(fleets), size, size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample random fleets.")
+    parser.add_argument("--fleets", type=int, default=100000)
+    add_board_arguments(parser)
+    parser.add_argument("--method", default=UNIFORM,
+                        choices=[UNIFORM, SEQUENTIAL])
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--numpy", action="store_true",
+                        help="Sample into a numpy array (uniform only)")
+    parser.add_argument("--show", type=int, default=0,
+                        help="Print this many of the sampled fleets")
+    args = parser.parse_args()
+    try:
+        config = parse_board(args.difficulty, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.numpy and args.method != UNIFORM:
+        parser.error("--numpy only samples uniform fleets")
+
+    sampler = FleetSampler(config, args.method, args.seed)
+    start = time.perf_counter()
+    if args.numpy:
+        fleets = sampler.sample_array(args.fleets)
+        shown = [tuple((code >> 1, ship_size, "hv"[code & 1])
+                       for code, ship_size in zip(fleet, config.fleet))
+                 for fleet in fleets[:args.show].tolist()]
+    else:
+        fleets = list(sampler.samples(args.fleets))
+        shown = fleets[:args.show]
+    elapsed = time.perf_counter() - start
+    print("Fleets per second: %.0f" % (args.fleets / elapsed))
+    for placements in shown:
+        print("")
+        place_fleet(Grid(config, verbose=False), placements).print_grid()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Compact, appendable binary log of finished games, and replay.
+
+Each game is one length-prefixed record, so logs can be appended to in bulk
+and read back one game at a time without loading the whole file. All values
+are little-endian:
+
+    u32  length of the rest of the record
+    u8   format version (2)
+    u8   board size (at most 100)
+    u16  ships per fleet
+    u8   1 if a seed follows the header, else 0
+    u64  seed (0 when absent)
+    per fleet (player a's, then player b's), per ship:
+        u8   ship size
+        u16  first cell << 1 | 1 if vertical
+    u16  number of shots
+    per shot: u16  cell << 2 | result
+
+Cells are numbered row * size + col, as in Grid.cell. Shots alternate
+between the players, player a first, and result is 0 for a miss, 1 for a
+hit and 2 for a hit that sank a ship. A shot takes two bytes.
+
+Version 1 records, with the number of ships as a u8, are still read.
+"""
+import struct
+from collections import namedtuple
+
+from main import VALID, Grid, fleet_config
+
+VERSION = 2
+
+_LENGTH = struct.Struct("<I")
+_VERSION = struct.Struct("<B")
+# Header of each version, format version included
+_HEADERS = {1: struct.Struct("<BBBBQ"), 2: struct.Struct("<BBHBQ")}
+_HEADER = _HEADERS[VERSION]
+_SHIP = struct.Struct("<BH")
+_COUNT = struct.Struct("<H")
+
+# placements_a and placements_b are the (first cell, ship size, direction)
+# tuples of Grid.placements; shots are (cell, result) pairs with result coded
+# as in the module docstring.
+GameRecord = namedtuple("GameRecord", ["seed", "size", "placements_a",
+                                       "placements_b", "shots"])
+
+MISS, HIT, SUNK = 0, 1, 2
+
+
+def result_code(is_hit):
+    """Converts a Grid.is_hit result to the logged result code"""
+    if is_hit is None:
+        return MISS
+    return SUNK if is_hit else HIT
+
+
+def encode(record):
+    """Returns the bytes for one game record, length prefix included"""
+    parts = [_HEADER.pack(VERSION, record.size, len(record.placements_a),
+                          record.seed is not None, record.seed or 0)]
+    for placements in (record.placements_a, record.placements_b):
+        for start, ship_size, direction in placements:
+            parts.append(_SHIP.pack(ship_size,
+                                    start << 1 | (direction == "v")))
+    parts.append(_COUNT.pack(len(record.shots)))
+    parts.append(struct.pack("<%dH" % len(record.shots),
+                             *[cell << 2 | code
+                               for cell, code in record.shots]))
+    payload = b"".join(parts)
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def decode(payload):
+    """Returns the GameRecord for one record, without its length prefix"""
+    (version,) = _VERSION.unpack_from(payload)
+    header = _HEADERS.get(version)
+    if header is None:
+        raise ValueError("Unsupported game log version: %d" % version)
+    _, size, ships, has_seed, seed = header.unpack_from(payload)
+    offset = header.size
+    fleets = []
+    for _ in range(2):
+        placements = []
+        for _ in range(ships):
+            ship_size, packed = _SHIP.unpack_from(payload, offset)
+            offset += _SHIP.size
+            placements.append((packed >> 1, ship_size,
+                               "v" if packed & 1 else "h"))
+        fleets.append(tuple(placements))
+    (count,) = _COUNT.unpack_from(payload, offset)
+    offset += _COUNT.size
+    packed_shots = struct.unpack_from("<%dH" % count, payload, offset)
+    shots = tuple((packed >> 2, packed & 3) for packed in packed_shots)
+    return GameRecord(seed if has_seed else None, size, fleets[0], fleets[1],
+                      shots)
+
+
+class GameLogWriter:
+    """Appends game records to a log file through a buffered file object.
+
+    Use as a context manager:
+        with GameLogWriter("games.log") as log:
+            simulate(100000, log=log)
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "ab")
+        return self
+
+    def __exit__(self, *exc_info):
+        self.file.close()
+        self.file = None
+
+    def append(self, record):
+        self.file.write(encode(record))
+
+
+def read_log(path):
+    """Yields the GameRecords of a log file one at a time"""
+    with open(path, "rb") as log:
+        while True:
+            prefix = log.read(_LENGTH.size)
+            if len(prefix) < _LENGTH.size:
+                return
+            (length,) = _LENGTH.unpack(prefix)
+            payload = log.read(length)
+            if len(payload) < length:
+                raise ValueError("Truncated game log record in " + str(path))
+            yield decode(payload)
+
+
+def replay(record, turn=None):
+    """Rebuilds the grids of a logged game after its first turn shots (all
+    of them if turn is None), without running either strategy.
+
+    Returns (grid_a, grid_b): each player's own grid, with their ships and
+    the shots fired at it marked as hits and misses. Raises ValueError if a
+    ship or a shot does not replay as logged.
+    """
+    config = fleet_config(record.size, tuple(
+        ship_size for _, ship_size, _ in record.placements_a))
+    grids = []
+    for player, placements in zip("ab", (record.placements_a,
+                                         record.placements_b)):
+        grid = Grid(config, verbose=False)
+        for ship, (start, ship_size, direction) in enumerate(placements):
+            if grid.place_ship_at(ship_size, start, direction) != VALID:
+                raise ValueError("Ship %d of player %s in the log cannot be "
+                                 "placed" % (ship, player))
+        grids.append(grid)
+
+    shots = record.shots if turn is None else record.shots[:turn]
+    for shot, (cell, code) in enumerate(shots):
+        # Player a fires the even shots, at player b's grid
+        target = grids[1 - shot % 2]
+        is_hit = target.is_hit(cell, "computer_player")
+        if result_code(is_hit) != code:
+            raise ValueError("Shot %d of the log does not match its replay"
+                             % shot)
+        target.mark_hit_or_miss(cell, is_hit, "computer_player")
+    return grids[0], grids[1]
@@ -0,0 +1,173 @@
+"""Cheap game state for lookahead search.
+
+A GameState is one fleet and the shots fired at it, without anything Grid
+keeps for play (labels, rendering, messages). It is meant for searches that
+try many hypothetical shot sequences from one position:
+    - apply_shot(cell) fires at a cell and returns what Grid.is_hit would
+    - undo_shot() takes back the last shot, back to any earlier position
+    - clone() returns an independent copy in constant time
+
+The layout of the fleet never changes and is shared by every clone. What
+shots change lives in a few small buffers (a byte per cell, a byte per ship
+and the shot history) that a clone shares with its source copy-on-write:
+each of the two copies them on its first change, so a position can be
+cloned many times while only the clones that are played pay for a copy.
+apply_shot and undo_shot write into those buffers in place, so once a state
+owns its buffers they allocate nothing.
+
+Usage:
+    state = GameState.from_grid(target_grid, player.guesses)
+    for cell in state.untried():
+        result = state.apply_shot(cell)
+        ...
+        state.undo_shot()
+"""
+from array import array
+
+
+class GameState:
+    """Shots fired at a fleet on a size x size board.
+
+    :param size: Board size.
+    :param placements: (first cell, ship size, direction) of each ship, as in
+        Grid.placements or fleets.FleetSampler.
+    :param shots: Cells already shot at, in order.
+    """
+    __slots__ = ("size", "ship_index", "ship_sizes", "shot", "hits_left",
+                 "history", "shots", "ships_left", "cells_left", "shared")
+
+    def __init__(self, size, placements, shots=()):
+        self.size = size
+        self.ship_sizes = tuple(ship_size for _, ship_size, _ in placements)
+        ship_index = array("B" if len(placements) < 255 else "H",
+                           [0]) * (size * size)
+        for ship_id, (start, ship_size, direction) in enumerate(placements):
+            step = 1 if direction == "h" else size
+            for cell in range(start, start + ship_size * step, step):
+                ship_index[cell] = ship_id + 1
+        self.ship_index = ship_index
+        # For each cell, 1 + the position of the ship covering it, or 0 for
+        # water. Never changed, so shared by all clones
+        self.shot = bytearray(size * size)
+        # 1 for each cell already shot at
+        self.hits_left = bytearray(self.ship_sizes)
+        # Number of unhit cells left on each ship
+        self.history = array("H", [0]) * (size * size)
+        self.shots = 0
+        # Cells shot at, in order, in the first self.shots entries
+        self.ships_left = len(placements)
+        self.cells_left = sum(self.ship_sizes)
+        self.shared = False
+        # True while the buffers may be shared with a clone
+        # Same as apply_shot for each shot, without a call per shot: searches
+        # build a state of the position they start from for every fleet
+        shot = self.shot
+        hits_left = self.hits_left
+        for cell in shots:
+            if shot[cell]:
+                raise ValueError("Cell already shot at: %d" % cell)
+            shot[cell] = 1
+            ship_id = ship_index[cell]
+            if ship_id:
+                hits_left[ship_id - 1] -= 1
+        if shots:
+            self.shots = len(shots)
+            self.history[:self.shots] = array("H", shots)
+            self.ships_left = sum(1 for left in hits_left if left)
+            self.cells_left = sum(hits_left)
+
+    @classmethod
+    def from_grid(cls, grid, shots=None):
+        """Returns the state of a grid's fleet.
+
+        :param shots: Cells shot at, in order, e.g. Player.guesses. Defaults
+            to the cells marked as hits or misses on the grid, in cell order.
+        """
+        if shots is None:
+            marked = grid.hits | grid.misses
+            shots = [cell for cell in range(grid.config.cells)
+                     if marked >> cell & 1]
+        return cls(grid.size, grid.placements, shots)
+
+    def clone(self):
+        """Returns an independent copy of the state, sharing its buffers
+        until either of the two changes
+        """
+        other = GameState.__new__(GameState)
+        other.size = self.size
+        other.ship_index = self.ship_index
+        other.ship_sizes = self.ship_sizes
+        other.shot = self.shot
+        other.hits_left = self.hits_left
+        other.history = self.history
+        other.shots = self.shots
+        other.ships_left = self.ships_left
+        other.cells_left = self.cells_left
+        other.shared = self.shared = True
+        return other
+
+    def __own(self):
+        """Copies the buffers this state may share with a clone"""
+        self.shot = self.shot[:]
+        self.hits_left = self.hits_left[:]
+        self.history = self.history[:]
+        self.shared = False
+
+    def apply_shot(self, cell):
+        """Fires at cell. Returns None for a miss, 0 for a hit, or the size
+        of the ship it sank, like Grid.is_hit. Raises ValueError if the cell
+        was already shot at.
+        """
+        if self.shot[cell]:
+            raise ValueError("Cell already shot at: %d" % cell)
+        if self.shared:
+            self.__own()
+        self.shot[cell] = 1
+        self.history[self.shots] = cell
+        self.shots += 1
+        ship_id = self.ship_index[cell]
+        if not ship_id:
+            return None
+        ship_id -= 1
+        hits_left = self.hits_left[ship_id] - 1
+        self.hits_left[ship_id] = hits_left
+        self.cells_left -= 1
+        if hits_left:
+            return 0
+        self.ships_left -= 1
+        return self.ship_sizes[ship_id]
+
+    def undo_shot(self):
+        """Takes back the last shot and returns its cell. Raises IndexError
+        if no shot is left to undo.
+        """
+        if not self.shots:
+            raise IndexError("No shot to undo")
+        if self.shared:
+            self.__own()
+        self.shots -= 1
+        cell = self.history[self.shots]
+        self.shot[cell] = 0
+        ship_id = self.ship_index[cell]
+        if ship_id:
+            ship_id -= 1
+            if not self.hits_left[ship_id]:
+                self.ships_left += 1
+            self.hits_left[ship_id] += 1
+            self.cells_left += 1
+        return cell
+
+    def game_over(self):
+        return not self.ships_left
+
+    def is_ship(self, cell):
+        return self.ship_index[cell] != 0
+
+    def untried(self):
+        """Returns the cells not shot at yet, in increasing order"""
+        shot = self.shot
+        return [cell for cell in range(len(shot)) if not shot[cell]]
+
+    def shot_cells(self):
+        """Returns the cells shot at, in order"""
+        return self.history[:self.shots].tolist()
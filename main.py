@@ -1,333 +1,560 @@
 import random
+import sys
+from array import array
+from functools import lru_cache
+
+# Ship types making up each player's fleet, in placement order
+FLEET = ["2x1", "3x1", "3x1", "4x1", "5x1"]
+
+# Largest supported board: 100x100, with columns A to CV
+MAX_BOARD_SIZE = 100
+
+# Times Grid.place_random_fleet starts a crowded fleet over before giving up
+FLEET_TRIES = 100
+
+# Results of the silent checks (Grid.check_placement, Grid.place_ship_at,
+# Player.check_guess). Only the console layer turns them into messages
+VALID = 0
+INVALID_COORD = 1  # not a coordinate on the board
+INVALID_DIRECTION = 2  # neither "h" nor "v"
+OUT_OF_BOUNDS = 3  # the ship would stick out of the board
+START_OCCUPIED = 4  # the chosen coordinate already holds a ship or a shot
+SHIP_IN_THE_WAY = 5  # another ship overlaps the rest of the placement
+ALREADY_GUESSED = 6  # the coordinate has been guessed before
+
+# Console message for each failed check
+MESSAGES = {
+    INVALID_COORD: "\nCoordinates are invalid. Please try again.",
+    INVALID_DIRECTION: "\nInvalid direction. Enter h for horizontal, v for "
+                       "vertical. Please try again",
+    OUT_OF_BOUNDS: "\nShip is out of bound. Please try again.",
+    START_OCCUPIED: "\nA ship has already been placed on those coordinates. "
+                    "Please try again.",
+    SHIP_IN_THE_WAY: "\nA ship is in the way. Pick another coordinate.\n",
+    ALREADY_GUESSED: "\nYou have already guessed this coordinate. Try again.",
+}
+
+
+def ship_type_size(ship_type):
+    """Returns the length of a ship type, e.g. 4 for "4x1" """
+    return int(ship_type.split("x")[0])
+
+
+# Ship lengths of FLEET
+FLEET_SIZES = tuple(ship_type_size(ship_type) for ship_type in FLEET)
+
+
+def column_label(index):
+    """Returns the label of a column: A to Z, then AA, AB, ... like a
+    spreadsheet
+    """
+    label = ""
+    index += 1
+    while index:
+        index, letter = divmod(index - 1, 26)
+        label = chr(ord("A") + letter) + label
+    return label
+
+
+class BoardConfig:
+    """Board geometry and fleet of a game. Grids, players, strategies and
+    simulations all read their board size, labels and ships from here, and
+    every grid of the same configuration shares its tables.
+    """
+    def __init__(self, size, fleet=None, name=None):
+        """
+        :param size: Number of rows and columns, up to MAX_BOARD_SIZE.
+        :param fleet: Ship lengths in placement order. Defaults to FLEET.
+        :param name: Name shown for the board, e.g. "easy". Defaults to
+            "<size>x<size>".
+        """
+        if fleet is None:
+            fleet = FLEET_SIZES
+        if not 1 <= size <= MAX_BOARD_SIZE:
+            raise ValueError("Board size must be between 1 and %d, not %d"
+                             % (MAX_BOARD_SIZE, size))
+        if not fleet or any(not 2 <= ship_size <= size for ship_size in fleet):
+            raise ValueError("Every ship must be between 2 and %d long" % size)
+        if sum(fleet) > size * size:
+            raise ValueError("The fleet does not fit on a %dx%d board"
+                             % (size, size))
+
+        self.size = size
+        self.name = name or "%dx%d" % (size, size)
+        self.cols = [column_label(i) for i in range(size)]
+        self.rows = list(range(size))
+        self.col_index = {label: i for i, label in enumerate(self.cols)}
+        # Label -> column index, e.g. "A" becomes 0
+        self.cells = size * size
+        self.all_cells = tuple(range(self.cells))
+        # Every cell id in order, for the untried pools of players and
+        # strategies
+        self.empty_ship_index = array("B" if len(fleet) < 255 else "H",
+                                      [0]) * self.cells
+        # Ship index of an empty grid: one byte per cell unless the fleet
+        # has 255 ships or more, widened by Grid if more ships are placed
+        self.coords = tuple((row, label) for row in self.rows
+                            for label in self.cols)
+        # Every (row, letter) coordinate in cell order: the display label of
+        # each cell id
+        self.coord_cells = {}
+        # Cell id of every coordinate, with the row as an int or a string
+        # and the letter in either case, so the usual forms decode with one
+        # lookup and (3, "F") and ("3", "f") are the same cell
+        for cell, (row, label) in enumerate(self.coords):
+            for row_key in (row, str(row)):
+                self.coord_cells[row_key, label] = cell
+                self.coord_cells[row_key, label.lower()] = cell
+        self.fleet = tuple(fleet)
+        self.ship_types = ["%dx1" % ship_size for ship_size in fleet]
+
+        # Rendering tables. Row labels are right-aligned to the widest row
+        # number, and every column is as wide as the longest column label
+        label_width = len(str(size - 1))
+        self.col_width = len(self.cols[-1])
+        self.header = " " * label_width + "".join(
+            " " + label.ljust(self.col_width) for label in self.cols)
+        self.row_labels = [str(row).rjust(label_width) + " "
+                           for row in self.rows]
+
+    def __repr__(self):
+        return "BoardConfig(%d, %r, %r)" % (self.size, list(self.fleet),
+                                            self.name)
+
+    def cell_id(self, coord):
+        """Decodes a coordinate into its cell id (row * size + col), or
+        returns None if it is not a cell of the board. Accepts a cell id, a
+        (row, letter) pair with the row as an int or a string and the letter
+        in any case, or text such as "3, F".
+        """
+        if coord.__class__ is int:
+            return coord if 0 <= coord < self.cells else None
+        try:
+            return self.coord_cells[coord]
+        except (KeyError, TypeError):
+            pass
+        # Unusual forms: lists, padding, leading zeros
+        if isinstance(coord, str):
+            coord = coord.split(",")
+        try:
+            row, label = coord
+            row = int(str(row).strip())
+            col = self.col_index.get(str(label).strip().upper())
+        except (TypeError, ValueError):
+            return None
+        if col is None or not 0 <= row < self.size:
+            return None
+        return row * self.size + col
+
+
+# Board configuration of each difficulty level
+DIFFICULTIES = {
+    "easy": BoardConfig(8, name="easy"),  # 8x8 grid
+    "medium": BoardConfig(10, name="medium"),  # 10x10 grid
+    "hard": BoardConfig(15, name="hard"),  # 15x15 grid
+}
+
+
+def board_config(difficulty):
+    """Returns the BoardConfig for a difficulty level. Accepts a BoardConfig,
+    a difficulty name or a custom size such as "30x30". Like the console game,
+    any other name is treated as hard. Custom sizes come from fleet_config,
+    so every grid of a size shares one config.
+    """
+    if isinstance(difficulty, BoardConfig):
+        return difficulty
+    name = difficulty.lower()
+    if name in DIFFICULTIES:
+        return DIFFICULTIES[name]
+    size, _, other = name.partition("x")
+    if size.isdigit() and size == other:
+        return fleet_config(int(size), FLEET_SIZES)
+    return DIFFICULTIES["hard"]
+
+
+@lru_cache(maxsize=None)
+def fleet_config(size, fleet):
+    """Returns the BoardConfig of a board size and fleet (a tuple of ship
+    lengths): the difficulty level's own config when they match one, else a
+    custom config, built once. Grids rebuilt from logs and snapshots and
+    grids of custom sizes share it.
+    """
+    for config in DIFFICULTIES.values():
+        if config.size == size and config.fleet == fleet:
+            return config
+    return BoardConfig(size, fleet)
+
+
+def ship_mask(size, ship_size, start, direction):
+    """Returns the bitmask covered by a ship_size x 1 ship whose upper-left
+    end is on cell start of a size x size board. The ship must fit.
+    """
+    if direction == "h":
+        return ((1 << ship_size) - 1) << start
+    mask = 0
+    for i in range(ship_size):
+        mask |= 1 << (start + i * size)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def legal_placements(size, ship_size):
+    """Returns every in-bounds placement of a ship_size x 1 ship on an empty
+    size x size board, as (mask, first cell, direction) tuples. Computed once
+    per board size and ship size.
+    """
+    placements = []
+    for row in range(size):
+        for col in range(size - ship_size + 1):
+            start = row * size + col
+            placements.append((ship_mask(size, ship_size, start, "h"),
+                               start, "h"))
+    for row in range(size - ship_size + 1):
+        for col in range(size):
+            start = row * size + col
+            placements.append((ship_mask(size, ship_size, start, "v"),
+                               start, "v"))
+    return tuple(placements)
+
+
+@lru_cache(maxsize=None)
+def placement_masks(size, ship_size):
+    """Returns the masks of the horizontal and of the vertical placements of
+    a ship_size x 1 ship, each indexed by first cell, with None where the
+    ship would leave the board
+    """
+    horizontal = [None] * (size * size)
+    vertical = [None] * (size * size)
+    for mask, start, direction in legal_placements(size, ship_size):
+        if direction == "h":
+            horizontal[start] = mask
+        else:
+            vertical[start] = mask
+    return tuple(horizontal), tuple(vertical)
 
 
 class Grid:
     """Grid class for setting up the battleship grid
+
+    The board is stored as integer bitmasks rather than a list of lists of
+    characters. Cell (row, col) is bit row * size + col of each mask:
+        - occupied: cells covered by a ship
+        - hits: cells marked as a hit ('X')
+        - misses: cells marked as a miss ('O')
+    Ship glyphs ('<', '-', '>', '^', '|', 'v') are only produced when the board
+    is printed.
+
+    Grids are slotted and keep per-cell state in packed arrays, so an idle
+    grid costs little beyond its ships; geometry and label tables live on
+    the shared BoardConfig.
     """
-    def __init__(self, difficulty):
-        """
-        :param difficulty: Difficulty chosen by user, determines grid size.
-            - easy: 8x8 grid
-            - medium: 10x10 grid
-            - hard: 15x15 grid
+    __slots__ = ("config", "difficulty", "verbose", "size", "cols", "rows",
+                 "col_index", "occupied", "hits", "misses", "ship_starts",
+                 "ship_sizes", "ship_index", "ship_hits_left", "ships_left",
+                 "cells_left", "rendered_rows")
+
+    def __init__(self, difficulty, verbose=True):
         """
-        self.difficulty = difficulty
-        self.grid = []
-        self.__construct_grid()
-        self.cols = []
-        self.rows = []
-        self.__labels()
-        self.ships = []
-        #  in front of each list in self.ship is the
-        #  size of the ship. so if a list only has 1 element left, then
-        #  read that element to know what size ship has sunk then delete that
-        #  last element
-
-    def __construct_grid(self):
-        """Create an empty grid based on chosen difficulty level
+        :param difficulty: Board of the grid, which sets both its size and
+            its fleet. Any form board_config accepts:
             - easy: 8x8 grid
             - medium: 10x10 grid
             - hard: 15x15 grid
+            - a custom size such as "30x30"
+            - a BoardConfig
+        :param verbose: Print hit messages to the console. Headless games
+            (see simulation.py) turn this off.
         """
-        if self.difficulty.lower() == "easy":
-            size = 8
-        elif self.difficulty.lower() == "medium":
-            size = 10
-        else:
-            size = 15
-
-        # Create an empty size x size grid
-        for i in range(size):
-            row = []
-            for j in range(size):
-                row.append(".")
-            self.grid.append(row)
-
-    def __labels(self):
-        """Sets column and row labels for the grid, depending on the difficulty
-        level/grid size
+        self.config = board_config(difficulty)
+        self.difficulty = self.config.name
+        self.verbose = verbose
+        # Geometry is shared with every grid of the same configuration
+        self.size = self.config.size
+        self.cols = self.config.cols
+        self.rows = self.config.rows
+        self.col_index = self.config.col_index
+        # An empty grid has no bits set in any of the masks
+        self.occupied = 0
+        self.hits = 0
+        self.misses = 0
+        self.ship_starts = array("H")
+        self.ship_sizes = array("B")
+        # First cell << 1 | 1 if vertical, and length, of each ship in the
+        # order it was placed; see placements and ships
+        self.ship_index = self.config.empty_ship_index[:]
+        # For each cell, 1 + the position of the ship covering it, or 0 if
+        # the cell is empty or has already been hit
+        self.ship_hits_left = array("B")
+        # Number of unhit coordinates left on each ship
+        self.ships_left = 0
+        self.cells_left = 0
+        # Ships still afloat and unhit ship cells on the whole grid, kept up
+        # to date by every placement and hit so game over is a single check
+        self.rendered_rows = None
+        # Cached display string of each row, None once the row has changed;
+        # the list itself is only made when the grid is first rendered
+
+    @property
+    def placements(self):
+        """(first cell, size, direction) of each ship, in the order they were
+        placed, used to draw the ship glyphs
         """
-        if self.difficulty.lower() == "easy":
-            self.cols = ["A", "B", "C", "D", "E", "F", "G", "H"]
-            self.rows = list(range(8))  # [0, 1, 2, 3, 4, 5, 6, 7]
+        return [(start >> 1, ship_size, "v" if start & 1 else "h")
+                for start, ship_size in zip(self.ship_starts, self.ship_sizes)]
 
-        elif self.difficulty.lower() == "medium":
-            self.cols = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "G"]
-            self.rows = list(range(10))
-
-        else:  # self.difficulty.lower == "hard"
-            self.cols = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "G", "K",
-                         "L", "M", "N", "O"]
-            self.rows = list(range(15))
+    @property
+    def ships(self):
+        """Each ship as a list of its size followed by its cell ids not hit
+        yet, or an empty list once it has sunk
+        """
+        ships = []
+        ship_index = self.ship_index
+        for ship_id, (start, ship_size, direction) in \
+                enumerate(self.placements):
+            if not self.ship_hits_left[ship_id]:
+                ships.append([])
+                continue
+            step = 1 if direction == "h" else self.size
+            ships.append([ship_size] + [
+                cell for cell in range(start, start + ship_size * step, step)
+                if ship_index[cell] == ship_id + 1])
+        return ships
+
+    def cell(self, coord):
+        """Converts any coordinate form of BoardConfig.cell_id to its cell id,
+        which is also its bit position in the masks. Raises ValueError if it
+        is not on the board.
+        """
+        cell = self.config.cell_id(coord)
+        if cell is None:
+            raise ValueError("Not a coordinate on the board: %r" % (coord,))
+        return cell
+
+    def coord(self, cell):
+        """Converts a cell id to its (row, letter) display label"""
+        return self.config.coords[cell]
+
+    def ship_labels(self):
+        """Returns self.ships for display, with (row, letter) labels in place
+        of cell ids
+        """
+        coords = self.config.coords
+        # Sunk ships are empty lists
+        return [ship[:1] + [coords[cell] for cell in ship[1:]]
+                for ship in self.ships]
+
+    @property
+    def grid(self):
+        """The board as a list of rows of display characters:
+        '.' empty, '<' '-' '>' '^' '|' 'v' ship, 'X' hit, 'O' miss
+        """
+        return [self.__row_glyphs(row) for row in self.rows]
+
+    def __row_glyphs(self, row):
+        """Returns the display characters of one row of the board"""
+        size = self.size
+        glyphs = ["."] * size
+        for start, ship_size, direction in self.placements:
+            ship_row, col = divmod(start, size)
+            if direction == "h":
+                if ship_row == row:
+                    glyphs[col:col + ship_size] = \
+                        "<" + "-" * (ship_size - 2) + ">"
+            elif ship_row <= row < ship_row + ship_size:
+                if row == ship_row:
+                    glyphs[col] = "^"
+                elif row == ship_row + ship_size - 1:
+                    glyphs[col] = "v"
+                else:
+                    glyphs[col] = "|"
+
+        row_mask = (1 << size) - 1
+        hits = self.hits >> (row * size) & row_mask
+        misses = self.misses >> (row * size) & row_mask
+        if hits or misses:
+            for col in range(size):
+                if hits >> col & 1:
+                    glyphs[col] = "X"
+                elif misses >> col & 1:
+                    glyphs[col] = "O"
+        return glyphs
+
+    def render_lines(self):
+        """Returns the lines printed by print_grid: the column labels, then
+        each row with its row label. Row strings are cached and only rebuilt
+        after a ship, hit or miss changes that row.
+        """
+        rendered = self.rendered_rows
+        if rendered is None:
+            rendered = self.rendered_rows = [None] * self.size
+        col_width = self.config.col_width
+        for row in self.rows:
+            if rendered[row] is None:
+                glyphs = self.__row_glyphs(row)
+                if col_width == 1:
+                    cells = " ".join(glyphs) + " "
+                else:
+                    cells = "".join(ch.ljust(col_width) + " " for ch in glyphs)
+                rendered[row] = self.config.row_labels[row] + cells
+        return [self.config.header] + rendered
 
     def print_grid(self):
         """Print out current board with column labels (letters) and
         row labels (numbers)
         """
-        if self.difficulty.lower() == "hard":
-            # Extra space is needed in front of letter labels to accommodate the
-            # width of double-digit numbers of rows
-            letter_to_print = "  "
+        sys.stdout.write("\n".join(self.render_lines()) + "\n")
+
+    def parse_coord(self, coord):
+        """Parses any coordinate form of BoardConfig.cell_id into its cell
+        id. Returns None if it is not a coordinate on the board.
+        """
+        return self.config.cell_id(coord)
+
+    def check_placement(self, ship_size, cell, direction):
+        """Returns VALID if a ship_size x 1 ship can go with its upper-left
+        end on cell, or the code of the first check it fails. Prints nothing
+        and changes nothing.
+        """
+        if direction == "h":
+            mask = placement_masks(self.size, ship_size)[0][cell]
+        elif direction == "v":
+            mask = placement_masks(self.size, ship_size)[1][cell]
         else:
-            letter_to_print = " "
-
-        # Print column labels (letters)
-        for i in range(len(self.cols)):
-            letter_to_print += " " + self.cols[i]
-        print(letter_to_print)
-
-        # Print the grid with row labels (numbers)
-        for i in range(len(self.cols)):
-            if self.difficulty.lower() == "hard" and i <= 9:
-                # Extra space needed for single digit number labels to
-                # accommodate width of double-digit numbers of rows
-                row = " " + str(i) + " "
+            return INVALID_DIRECTION
+        if mask is None:
+            return OUT_OF_BOUNDS
+        occupied = self.occupied
+        if mask & occupied:
+            return START_OCCUPIED if occupied >> cell & 1 else SHIP_IN_THE_WAY
+        # Shots only land once the game is under way, so skip the
+        # shifts while there are none
+        if (self.hits or self.misses) and \
+                (self.hits | self.misses) >> cell & 1:
+            return START_OCCUPIED
+        return VALID
+
+    def place_ship_at(self, ship_size, cell, direction):
+        """Places a ship_size x 1 ship with its upper-left end on cell if
+        check_placement allows it. Returns the check's code; nothing is
+        placed unless it is VALID.
+        """
+        code = self.check_placement(ship_size, cell, direction)
+        if code == VALID:
+            self.__add_ship(placement_masks(self.size, ship_size)
+                            [direction == "v"][cell], cell, ship_size,
+                            direction)
+        return code
+
+    def place_ship(self, ship_size, coord, direction):
+        """Places a ship_size x 1 ship with its upper-left end at coord, for a
+        ship of any size. Returns the grid if the ship is within bounds and
+        does not overlap another ship, returns None otherwise. Nothing is
+        placed on failure. Use place_ship_at to learn why a placement failed.
+        """
+        cell = self.parse_coord(coord)
+        if cell is None or \
+                self.check_placement(ship_size, cell, direction) != VALID:
+            return None
+        self.__add_ship(placement_masks(self.size, ship_size)
+                        [direction == "v"][cell], cell, ship_size, direction)
+        return self
+
+    def place_random_ship(self, ship_size, rng=random):
+        """Places a ship_size x 1 ship at a placement drawn uniformly from
+        every placement that is still legal on this grid. Returns the grid, or
+        None if the ship no longer fits anywhere.
+        """
+        occupied = self.occupied
+        legal = [placement for placement
+                 in legal_placements(self.size, ship_size)
+                 if not placement[0] & occupied]
+        if not legal:
+            return None
+        mask, start, direction = rng.choice(legal)
+        self.__add_ship(mask, start, ship_size, direction)
+        return self
+
+    def place_random_fleet(self, rng=random, place=None):
+        """Places the whole fleet of the grid's config at random. When a
+        ship no longer fits, the ships placed so far are taken off and the
+        fleet starts over, up to FLEET_TRIES times. Returns the grid; raises
+        ValueError if the fleet could not be packed. The grid must have no
+        ships or shots yet.
+
+        :param place: Called as place(grid, ship_size, rng) to place one
+            ship, returning None if it does not fit. Defaults to
+            place_random_ship.
+        """
+        if place is None:
+            place = Grid.place_random_ship
+        for _ in range(FLEET_TRIES):
+            for ship_size in self.config.fleet:
+                if place(self, ship_size, rng) is None:
+                    self.__remove_ships()
+                    break
+            else:
+                return self
+        raise ValueError("Could not fit the fleet %s on a %dx%d board"
+                         % (list(self.config.fleet), self.size, self.size))
+
+    def __remove_ships(self):
+        """Takes every ship off a grid that has not been shot at"""
+        self.occupied = 0
+        self.ship_starts = array("H")
+        self.ship_sizes = array("B")
+        self.ship_index = self.config.empty_ship_index[:]
+        self.ship_hits_left = array("B")
+        self.ships_left = 0
+        self.cells_left = 0
+        self.rendered_rows = None
+
+    def __add_ship(self, mask, start, ship_size, direction):
+        """Records a ship that has already been checked to be legal"""
+        self.occupied |= mask
+        self.ship_starts.append(start << 1 | (direction == "v"))
+        self.ship_sizes.append(ship_size)
+
+        row = start // self.size
+        step = 1 if direction == "h" else self.size
+        if self.rendered_rows is not None:
+            if direction == "h":
+                self.rendered_rows[row] = None
             else:
-                row = str(i) + " "
-            for ch in self.grid[i]:
-                row += ch + " "
-            print(row)
+                self.rendered_rows[row:row + ship_size] = [None] * ship_size
+        ship_id = len(self.ship_sizes)
+        if ship_id > 255 and self.ship_index.typecode == "B":
+            # More ships than the fleet: widen the index to two bytes
+            self.ship_index = array("H", self.ship_index)
+        for cell in range(start, start + ship_size * step, step):
+            self.ship_index[cell] = ship_id
+        self.ship_hits_left.append(ship_size)
+        self.ships_left += 1
+        self.cells_left += ship_size
 
     def place_2x1_ship(self, coord, direction):
         """Returns a grid with placed 2x1 ship if given coordinates and direction
         for the ship is valid and within bounds.
         Returns None if coordinates are invalid.
         """
-        # Convert letter coordinate to index number on grid (e.g. A becomes 0)
-        letter_coord = self.cols.index(coord[1].upper())
-
-        if direction == "h":
-            # Check if ship will be within horizontal bounds of the board
-            if letter_coord + 1 >= len(self.cols):
-                print("Ship is out of bound. Please try again.")
-                return None
-            # Place the left end of the ship
-            self.grid[int(coord[0])][letter_coord] = "<"
-
-            # Check if the right end is already occupied
-            if self.grid[int(coord[0])][letter_coord + 1] != ".":
-                print("\nA ship has already been placed on those coordinates.")
-                return None
-
-            # Place the right end of the ship
-            self.grid[int(coord[0])][letter_coord + 1] = ">"
-
-            # Ship has been successfully placed.
-            # First element of the list is the size of the placed ship
-            self.ships.append([2, (int(coord[0]), self.cols[letter_coord]),
-                               (coord[0], self.cols[letter_coord + 1])])
-
-        else:   # direction == "v"
-            # Check if ship will be within vertical bounds of the board
-            if (int(coord[0]) + 1) not in self.rows:
-                print("Ship is out of bound. Please try again.")
-                return None
-            # Place the top end of the ship
-            self.grid[int(coord[0])][letter_coord] = "^"
-
-            # Check if the bottom end is already occupied
-            if self.grid[int(coord[0]) + 1][letter_coord] != ".":
-                print("\nA ship has already been placed on those coordinates.")
-                return None
-
-            # Place the bottom end of the ship
-            self.grid[int(coord[0]) + 1][letter_coord] = "v"
-
-            # Ship has been successfully placed. Add the coords to ship list
-            # First element of the list is the size of the placed ship
-            self.ships.append([2, (int(coord[0]), self.cols[letter_coord]),
-                               (int(coord[0]) + 1, self.cols[letter_coord])])
-
-        return self.grid
+        return self.place_ship(2, coord, direction)
 
     def place_3x1_ship(self, coord, direction):
         """Returns a grid with placed 3x1 ship. Returns None if coordinates
         are invalid.
         """
-        letter_coord = self.cols.index(coord[1].upper())
-        if direction == "h":
-            if letter_coord + 1 >= len(self.cols) or \
-                    letter_coord + 2 >= len(self.cols) or \
-                    coord[1] in self.cols[-2:]:
-                print("\nShip is out of bound. Please try again.")
-                return None
-            else:
-                if not self.grid[int(coord[0])][letter_coord + 1] == "." or \
-                        not self.grid[int(coord[0])][letter_coord + 2] == ".":
-                    print("\nA ship is in the way. Pick another coordinate.\n")
-                    return None
-
-                self.grid[int(coord[0])][letter_coord] = "<"
-                self.grid[int(coord[0])][letter_coord + 1] = "-"
-                self.grid[int(coord[0])][letter_coord + 2] = ">"
-
-                # self.ships[3] = [(int(coord[0]), self.cols[letter_coord]),
-                #                     (int(coord[0]), self.cols[letter_coord + 1]),
-                #                     (int(coord[0]), self.cols[letter_coord + 2])]
-
-                self.ships.append([3, (int(coord[0]), self.cols[letter_coord]),
-                                   (int(coord[0]), self.cols[letter_coord + 1]),
-                                   (int(coord[0]), self.cols[letter_coord + 2])])
-
-        else:  # direction == 'v'
-            if (int(coord[0]) + 1) not in self.rows or \
-                    (int(coord[0]) + 2) not in self.rows or \
-                    int(coord[0]) >= self.rows[-2]:
-                print("Ship is out of bound. Please try again.")
-                return None
-            else:
-                if not self.grid[int(coord[0]) + 1][letter_coord] == "." or \
-                        not self.grid[int(coord[0]) + 2][letter_coord] == ".":
-                    print("\nA ship is in the way. Pick another coordinate.\n")
-                    return None
-
-                self.grid[int(coord[0])][letter_coord] = "^"
-                self.grid[int(coord[0]) + 1][letter_coord] = "|"
-                self.grid[int(coord[0]) + 2][letter_coord] = "v"
-
-                # self.ships[3] = [(int(coord[0]), self.cols[letter_coord]),
-                #                  (int(coord[0]) + 1, self.cols[letter_coord]),
-                #                  (int(coord[0]) + 2, self.cols[letter_coord])]
-                self.ships.append([3, (int(coord[0]), self.cols[letter_coord]),
-                                   (int(coord[0]) + 1, self.cols[letter_coord]),
-                                   (int(coord[0]) + 2, self.cols[letter_coord])])
-        return self.grid
+        return self.place_ship(3, coord, direction)
 
     def place_4x1_ship(self, coord, direction):
         """Returns a grid with placed 4x1 ship. Returns None if coordinates
         are invalid.
         """
-        letter_coord = self.cols.index(coord[1].upper())
-
-        if direction == "h":
-            if letter_coord + 1 >= len(self.cols) or \
-                    letter_coord + 2 >= len(self.cols) or\
-                    letter_coord + 3 >= len(self.cols) or \
-                    coord[1] in self.cols[-3:]:
-                print("Ship is out of bound. Please try again.")
-                return None
-            else:
-                if not self.grid[int(coord[0])][letter_coord + 1] == "." or \
-                        not self.grid[int(coord[0])][letter_coord + 2] == "." or \
-                        not self.grid[int(coord[0])][letter_coord + 3] == ".":
-                    print("\nA ship is in the way. Pick another coordinate.\n")
-                    return None
-
-                self.grid[int(coord[0])][letter_coord] = "<"
-                self.grid[int(coord[0])][letter_coord + 1] = "-"
-                self.grid[int(coord[0])][letter_coord + 2] = "-"
-                self.grid[int(coord[0])][letter_coord + 3] = ">"
-
-                # self.ships[4] = [(int(coord[0]), self.cols[letter_coord]),
-                #                  (int(coord[0]), self.cols[letter_coord + 1]),
-                #                  (int(coord[0]), self.cols[letter_coord + 2]),
-                #                  (int(coord[0]), self.cols[letter_coord + 3])]
-                self.ships.append([4, (int(coord[0]), self.cols[letter_coord]),
-                                   (int(coord[0]), self.cols[letter_coord + 1]),
-                                   (int(coord[0]), self.cols[letter_coord + 2]),
-                                   (int(coord[0]), self.cols[letter_coord + 3])])
-
-        else:  # direction == 'v'
-            if (int(coord[0]) + 1) not in self.rows or \
-                    (int(coord[0]) + 2) not in self.rows or \
-                    (int(coord[0]) + 3) not in self.rows or \
-                    int(coord[0]) >= self.rows[-3]:
-                print("Ship is out of bound. Please try again.")
-                return None
-            else:
-                if not self.grid[int(coord[0]) + 1][letter_coord] == "." or \
-                        not self.grid[int(coord[0]) + 2][letter_coord] == "." or \
-                        not self.grid[int(coord[0]) + 3][letter_coord] == ".":
-                    print("\nA ship is in the way. Pick another coordinate.\n")
-                    return None
-
-                self.grid[int(coord[0])][letter_coord] = "^"
-                self.grid[int(coord[0]) + 1][letter_coord] = "|"
-                self.grid[int(coord[0]) + 2][letter_coord] = "|"
-                self.grid[int(coord[0]) + 3][letter_coord] = "v"
-
-                # self.ships[4] = [(int(coord[0]), self.cols[letter_coord]),
-                #                  (int(coord[0]) + 1, self.cols[letter_coord]),
-                #                  (int(coord[0]) + 2, self.cols[letter_coord]),
-                #                  (int(coord[0]) + 3, self.cols[letter_coord])]
-                self.ships.append([4, (int(coord[0]), self.cols[letter_coord]),
-                                   (int(coord[0]) + 1, self.cols[letter_coord]),
-                                   (int(coord[0]) + 2, self.cols[letter_coord]),
-                                   (int(coord[0]) + 3, self.cols[letter_coord])])
-        return self.grid
+        return self.place_ship(4, coord, direction)
 
     def place_5x1_ship(self, coord, direction):
         """Returns a grid with placed 5x1 ship. Returns None if coordinates
         are invalid.
         """
-        letter_coord = self.cols.index(coord[1].upper())
-
-        if direction == "h":
-            if letter_coord + 1 >= len(self.cols) or \
-                    letter_coord + 2 >= len(self.cols) or \
-                    letter_coord + 3 >= len(self.cols) or \
-                    letter_coord + 4 >= len(self.cols) or \
-                    coord[1] in self.cols[-4:]:
-                print("Ship is out of bound. Please try again.")
-                return None
-            else:
-                if not self.grid[int(coord[0])][letter_coord + 1] == "." or \
-                        not self.grid[int(coord[0])][letter_coord + 2] == "." or \
-                        not self.grid[int(coord[0])][letter_coord + 3] == "." or \
-                        not self.grid[int(coord[0])][letter_coord + 4] == ".":
-                    print("\nA ship is in the way. Pick another coordinate.\n")
-                    return None
-
-                self.grid[int(coord[0])][letter_coord] = "<"
-                self.grid[int(coord[0])][letter_coord + 1] = "-"
-                self.grid[int(coord[0])][letter_coord + 2] = "-"
-                self.grid[int(coord[0])][letter_coord + 3] = "-"
-                self.grid[int(coord[0])][letter_coord + 4] = ">"
-
-                # self.ships[5] = [(int(coord[0]), self.cols[letter_coord]),
-                #                  (int(coord[0]), self.cols[letter_coord + 1]),
-                #                  (int(coord[0]), self.cols[letter_coord + 2]),
-                #                  (int(coord[0]), self.cols[letter_coord + 3]),
-                #                  (int(coord[0]), self.cols[letter_coord + 4])]
-                self.ships.append([5, (int(coord[0]), self.cols[letter_coord]),
-                                   (int(coord[0]), self.cols[letter_coord + 1]),
-                                   (int(coord[0]), self.cols[letter_coord + 2]),
-                                   (int(coord[0]), self.cols[letter_coord + 3]),
-                                   (int(coord[0]), self.cols[letter_coord + 4])])
-
-        else:  # direction == 'v'
-            if (int(coord[0]) + 1) not in self.rows or \
-                    (int(coord[0]) + 2) not in self.rows or \
-                    (int(coord[0]) + 3) not in self.rows or \
-                    (int(coord[0]) + 4) not in self.rows or \
-                    int(coord[0]) >= self.rows[-4]:
-                print("Ship is out of bound. Please try again.")
-                return None
-            else:
-                if not self.grid[int(coord[0]) + 1][letter_coord] == "." or \
-                        not self.grid[int(coord[0]) + 2][letter_coord] == "." or \
-                        not self.grid[int(coord[0]) + 3][letter_coord] == "." or \
-                        not self.grid[int(coord[0]) + 4][letter_coord] == ".":
-                    print("\nA ship is in the way. Pick another coordinate.\n")
-                    return None
-
-                self.grid[int(coord[0])][letter_coord] = "^"
-                self.grid[int(coord[0]) + 1][letter_coord] = "|"
-                self.grid[int(coord[0]) + 2][letter_coord] = "|"
-                self.grid[int(coord[0]) + 3][letter_coord] = "|"
-                self.grid[int(coord[0]) + 4][letter_coord] = "v"
-
-                # self.ships[5] = [(int(coord[0]), self.cols[letter_coord]),
-                #                  (int(coord[0]) + 1, self.cols[letter_coord]),
-                #                  (int(coord[0]) + 2, self.cols[letter_coord]),
-                #                  (int(coord[0]) + 3, self.cols[letter_coord]),
-                #                  (int(coord[0]) + 4, self.cols[letter_coord])]
-                self.ships.append([5, (int(coord[0]), self.cols[letter_coord]),
-                                   (int(coord[0]) + 1, self.cols[letter_coord]),
-                                   (int(coord[0]) + 2, self.cols[letter_coord]),
-                                   (int(coord[0]) + 3, self.cols[letter_coord]),
-                                   (int(coord[0]) + 4, self.cols[letter_coord])])
-        return self.grid
+        return self.place_ship(5, coord, direction)
 
     def preliminary_checks(self, coord, direction):
         """Conducts preliminary checks on the validity of ship placements,
@@ -335,37 +562,16 @@ class Grid:
             - Checks if coordinates are within bounds of the board
             - Checks if the chosen coordinate is already occupied.
 
-        Returns the updated game grid if the placement is valid, returns None
-        if placement is invalid.
+        Returns the grid if the placement is valid, returns None
+        if placement is invalid. Prints nothing; see check_placement for the
+        reason of a failure.
         """
-        # Convert the letter coordinate to an index
-        if not coord[1].upper() in self.cols:
-            print("\nCoordinates are invalid. Please try again.")
-            return None
-        else:
-            letter_coord = self.cols.index(coord[1].upper())
-
-        # Check if coordinates are within bounds of the board
-        if int(coord[0]) < 0 or int(coord[0]) >= len(self.cols) or \
-                coord[1].upper() not in self.cols:
-            print("\nCoordinates are invalid. Please try again.")
+        cell = self.parse_coord(coord)
+        # Every ship is at least two long
+        if cell is None or self.check_placement(2, cell, direction) \
+                not in (VALID, SHIP_IN_THE_WAY):
             return None
-
-        # Check if the ship is out of bounds based on direction
-        if direction == "h" and coord[1] == self.cols[-1]:
-            print("\nShip is out of bound. Please try again.")
-            return None
-        if direction == "v" and int(coord[0]) >= self.rows[-1]:
-            print("\nShip is out of bound. Please try again.")
-            return None
-
-        # Check if the chosen coordinate is already occupied
-        if self.grid[int(coord[0])][letter_coord] != ".":
-            print("\nA ship has already been placed on those coordinates. "
-                  "Please try again.")
-            return None
-
-        return self.grid
+        return self
 
     def is_hit(self, coord, player_type):
         """Check if coordinate hit or miss a ship coordinate.
@@ -373,66 +579,148 @@ class Grid:
             - if full ship has been sunk, return the size of that ship
             - if it is a hit but a full ship has not been sunk, return 0
         If it's a miss, return None
+
+        :param coord: Cell id, or any coordinate form of BoardConfig.cell_id.
+            Raises ValueError if it is not on the board.
         """
-        sunk_ship_size = 0
-        for ship in self.ships:
-            for coordinate in ship:
-                if type(coordinate) is tuple and coordinate == (int(coord[0]), coord[1].upper()):
-                    if player_type == "human_player":
-                        print("Your ship has been hit.")
-                    ship.remove(coordinate)
-                    if len(ship) == 1 and isinstance(ship[0], int):
-                        # if player_type == "computer_player":
-                        #     print("You have sunk a", ship[0], "x 1 ship!")
-                        sunk_ship_size = ship.pop(0)
-                        # Size of sunk ship is the first element of the list
-                    return sunk_ship_size
-        return None
+        # Cell ids out of range go through self.cell, which rejects them
+        cell = (coord if coord.__class__ is int and
+                0 <= coord < self.config.cells else self.cell(coord))
+        # Cells leave the index once hit, so a repeated shot is a miss
+        ship_id = self.ship_index[cell] - 1
+        if ship_id < 0:
+            return None
+        self.ship_index[cell] = 0
+
+        if player_type == "human_player" and self.verbose:
+            print("Your ship has been hit.")
+        self.cells_left -= 1
+        hits_left = self.ship_hits_left[ship_id] - 1
+        self.ship_hits_left[ship_id] = hits_left
+        if hits_left == 0:
+            self.ships_left -= 1
+            return self.ship_sizes[ship_id]
+        return 0
 
     def mark_hit_or_miss(self, coord, is_hit, player_type):
         """Modifies target grid to represent hit ('X') and misses ('O')
         Modifies on human player's grid only if it's a hit ('X')."""
-        letter_coord = self.cols.index(coord[1].upper())
+        cell = (coord if coord.__class__ is int and
+                0 <= coord < self.config.cells else self.cell(coord))
         if is_hit is not None:
-            self.grid[int(coord[0])][letter_coord] = "X"
+            self.hits |= 1 << cell
         else:
             if player_type == "computer_player":
-                self.grid[int(coord[0])][letter_coord] = "O"
+                self.misses |= 1 << cell
+            else:
+                return
+        if self.rendered_rows is not None:
+            self.rendered_rows[cell // self.size] = None
 
 
 class Player:
     """Player class for setting up player attributes, such as the player's
     guesses
     """
+    __slots__ = ("grid", "guesses", "guessed", "untried", "untried_index")
+
     def __init__(self, grid):
         self.grid = grid
-        self.guesses = []
+        cells = grid.config.cells
+        self.guesses = array("H")
+        # Cell id of every guess, in the order it was made
+        self.guessed = bytearray(cells)
+        # 1 for each cell id already guessed
+        self.untried = None
+        # Cell ids not guessed yet, in no particular order. Only players
+        # that draw random guesses need it, so it is built on the first
+        # random_untried call
+        self.untried_index = None
+        # Position of each cell id in self.untried, while it is there
+
+    def has_guessed(self, guess):
+        """Returns True if guess (a cell id or any coordinate form of
+        BoardConfig.cell_id) has already been made
+        """
+        cell = (guess if guess.__class__ is int and
+                0 <= guess < self.grid.config.cells
+                else self.grid.parse_coord(guess))
+        return cell is not None and self.guessed[cell] == 1
+
+    def check_guess(self, guess):
+        """Returns VALID if guess is a coordinate on the board that has not
+        been guessed yet, else INVALID_COORD or ALREADY_GUESSED
+        """
+        cell = self.grid.parse_coord(guess)
+        if cell is None:
+            return INVALID_COORD
+        if self.guessed[cell]:
+            return ALREADY_GUESSED
+        return VALID
 
     def guess_coord(self, guess):
         """If guess is already in self.guesses, returns None.
-        If guess if not in self.guesses, adds to the list of guesses"""
-        if guess not in self.guesses:
-            self.guesses.append(guess)
-        else:
+        If guess if not in self.guesses, adds it to the list of guesses and
+        returns its cell id. Raises ValueError if it is not on the board.
+        """
+        cell = (guess if guess.__class__ is int and
+                0 <= guess < self.grid.config.cells
+                else self.grid.cell(guess))
+        if self.guessed[cell]:
             return None
+        self.guesses.append(cell)
+        self.guessed[cell] = 1
+        untried = self.untried
+        if untried is not None:
+            # Remove from the untried pool by moving the last cell into its
+            # place
+            last = untried.pop()
+            if last != cell:
+                i = self.untried_index[cell]
+                untried[i] = last
+                self.untried_index[last] = i
+        return cell
+
+    def random_untried(self, rng=random):
+        """Returns a cell id drawn uniformly from those not guessed yet"""
+        if self.untried is None:
+            # Replaying the guesses gives the pool the same order as if it
+            # had been kept from the start
+            untried = list(self.grid.config.all_cells)
+            untried_index = array("H", untried)
+            for cell in self.guesses:
+                last = untried.pop()
+                if last != cell:
+                    i = untried_index[cell]
+                    untried[i] = last
+                    untried_index[last] = i
+            self.untried = untried
+            self.untried_index = untried_index
+        return rng.choice(self.untried)
 
 
 class Game:
     """Game class for handling game attributes"""
     # TODO: game class should interact with player class instead of grid class
-    def __init__(self, human_player, computer_player):
+    __slots__ = ("human_player", "computer_player", "verbose")
+
+    def __init__(self, human_player, computer_player, verbose=True):
         self.human_player = human_player
         self.computer_player = computer_player
+        self.verbose = verbose
 
     def game_over(self):
         """Return True is player has sunk all their opponent's ships, and prints
-        the winner to console. Return False otherwise.
+        the winner to console. Return False otherwise. Reads the grids' live
+        ship counters, so the check takes constant time.
         """
-        if all(x == [] for x in human_player.grid.ships):
-            print("You have lost! Game over.")
+        if not self.human_player.grid.ships_left:
+            if self.verbose:
+                print("You have lost! Game over.")
             return True
-        if all(x == [] for x in computer_player.grid.ships):
-            print("You have won! Game over.")
+        if not self.computer_player.grid.ships_left:
+            if self.verbose:
+                print("You have won! Game over.")
             return True
         return False
 
@@ -483,9 +771,14 @@ def handle_input(ship_type):
     return tuple_coord, dir
 
 
-def place_ship(ship_type, grid, player_type, difficulty):
+def place_ship(ship_type, grid, player_type, difficulty, rng=random):
     """Function for placing ships on the grid based on player type (human
     player or computer player).
+
+    :param difficulty: Kept for existing callers; the board geometry comes
+        from grid.config.
+    :param rng: Source of randomness for computer placements. Defaults to the
+        global random module; headless games pass a seeded random.Random.
     """
     if player_type == "human_player":
         placed_ship = None
@@ -496,65 +789,58 @@ def place_ship(ship_type, grid, player_type, difficulty):
             except TypeError:
                 continue
 
-            # Perform preliminary checks on the chosen coordinates and direction
-            checker = grid.preliminary_checks(tuple_coord, dir)
-            if checker is None:
+            # Parse the coordinate once, then check and place the ship based
+            # on its type, e.g. "3x1" is 3 long
+            cell = grid.parse_coord(tuple_coord)
+            if cell is None:
+                print(MESSAGES[INVALID_COORD])
+                continue
+            code = grid.place_ship_at(ship_type_size(ship_type), cell, dir)
+            if code != VALID:
+                print(MESSAGES[code])
                 continue
-            # Place the ship on the grid based on its type
-            if ship_type == "2x1":
-                placed_ship = grid.place_2x1_ship(tuple_coord, dir)
-            elif ship_type == "3x1":
-                placed_ship = grid.place_3x1_ship(tuple_coord, dir)
-            elif ship_type == "4x1":
-                placed_ship = grid.place_4x1_ship(tuple_coord, dir)
-            elif ship_type == "5x1":
-                placed_ship = grid.place_5x1_ship(tuple_coord, dir)
+            placed_ship = grid
 
         grid.print_grid()
 
     else:
-        if difficulty.lower() == "easy":
-            cols = ["A", "B", "C", "D", "E", "F", "G", "H"]
-            rows = list(range(8))  # [0, 1, 2, 3, 4, 5, 6, 7]
-
-        elif difficulty.lower() == "medium":
-            cols = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "G"]
-            rows = list(range(10))
+        # Draw straight from the placements still legal on the grid, so no
+        # attempt is ever rejected. Only a crowded fleet can run out of room;
+        # Grid.place_random_fleet starts such a fleet over instead
+        if grid.place_random_ship(ship_type_size(ship_type), rng) is None:
+            raise ValueError("No room left for a %s ship" % ship_type)
 
-        else:  # self.difficulty.lower == "hard"
-            cols = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "G", "K",
-                         "L", "M", "N", "O"]
-            rows = list(range(15))
 
-        placed_ship = None
-        while placed_ship is None:
-            dir = random.choice(["h", "v"])
-            tuple_coord = (random.choice(rows), random.choice(cols))
-            checker = grid.preliminary_checks(tuple_coord, dir)
-
-            if checker is None:
-                continue
-
-            if ship_type == "2x1":
-                placed_ship = grid.place_2x1_ship(tuple_coord, dir)
-            elif ship_type == "3x1":
-                placed_ship = grid.place_3x1_ship(tuple_coord, dir)
-            elif ship_type == "4x1":
-                placed_ship = grid.place_4x1_ship(tuple_coord, dir)
-            elif ship_type == "5x1":
-                placed_ship = grid.place_5x1_ship(tuple_coord, dir)
+def display_grids(player_grid, target_grid, side_by_side=False):
+    """Print player grid and target grid, one above the other or side by
+    side. The whole frame is built first and written in a single call.
+    """
+    player_lines = player_grid.render_lines()
+    target_lines = target_grid.render_lines()
+    if side_by_side:
+        width = max(len(line) for line in player_lines) + 4
+        lines = ["Your grid:".ljust(width) + "Target Grid:"]
+        lines += [player_line.ljust(width) + target_line for player_line,
+                  target_line in zip(player_lines, target_lines)]
+    else:
+        lines = ["Your grid:"] + player_lines + ["Target Grid:"] + target_lines
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
-def display_grids(player_grid, target_grid):
-    """Print player grid and target grid"""
-    print("Your grid:")
-    player_grid.print_grid()
+if __name__ == '__main__':
+    import argparse
 
-    print("Target Grid:")
-    target_grid.print_grid()
+    from ai import DensityStrategy
 
+    parser = argparse.ArgumentParser(description="Play battleship against "
+                                                 "the computer.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for the computer's placements and shots, "
+                             "to replay a game")
+    args = parser.parse_args()
+    # Every random decision of the computer comes from this one stream
+    rng = random.Random(args.seed)
 
-if __name__ == '__main__':
     print("")
     print("""
                                    ~~~  Welcome to  ~~~
@@ -577,23 +863,17 @@ if __name__ == '__main__':
     while difficulty_level.lower() not in ["easy", "medium", "hard"]:
         difficulty_level = input("Invalid input. Choose Easy, Medium, or Hard: ")
 
-    grid = Grid(difficulty_level)
+    # Every grid and check below derives its geometry from this
+    config = board_config(difficulty_level)
+
+    grid = Grid(config)
     print("")
     grid.print_grid()
     print("")
 
-    # placing the 2x1 ship
-    place_ship("2x1", grid, "human_player", difficulty_level)
-
-    # placing the 3x1 ships
-    place_ship("3x1", grid, "human_player", difficulty_level)
-    place_ship("3x1", grid, "human_player", difficulty_level)
-
-    # placing the 4x1 ship
-    place_ship("4x1", grid, "human_player", difficulty_level)
-
-    # placing the 5x1 ship
-    place_ship("5x1", grid, "human_player", difficulty_level)
+    # placing the 2x1, 3x1, 3x1, 4x1 and 5x1 ships
+    for ship_type in config.ship_types:
+        place_ship(ship_type, grid, "human_player", config)
 
     # Setting up computer's grid and ship placements
     print("\nThe computer will now place its ships. This process will be "
@@ -601,18 +881,14 @@ if __name__ == '__main__':
     input("Press Enter to continue...")
     print("\nThe computer will begin to place its ships:")
 
-    computer_grid = Grid(difficulty_level)
-    place_ship("2x1", computer_grid, "computer_player", difficulty_level)
-    place_ship("3x1", computer_grid, "computer_player", difficulty_level)
-    place_ship("3x1", computer_grid, "computer_player", difficulty_level)
-    place_ship("4x1", computer_grid, "computer_player", difficulty_level)
-    place_ship("5x1", computer_grid, "computer_player", difficulty_level)
+    computer_grid = Grid(config)
+    computer_grid.place_random_fleet(rng)
 
     print("\nComputer's final grid:")
     computer_grid.print_grid()
 
-    print("Computer player's ship placements:", computer_grid.ships)
-    print("Human player's ship placements:", grid.ships)
+    print("Computer player's ship placements:", computer_grid.ship_labels())
+    print("Human player's ship placements:", grid.ship_labels())
 
     # ============================= Instructions =============================
     input("Press Enter to continue to instructions. ")
@@ -634,26 +910,13 @@ if __name__ == '__main__':
     human_player = Player(grid)
     computer_player = Player(computer_grid)
 
-    target_grid = Grid(difficulty_level)
+    target_grid = Grid(config)
 
     battleship_game = Game(human_player, computer_player)
+    computer_strategy = DensityStrategy(computer_player, rng)
 
     display_grids(grid, target_grid)
 
-    # Determine valid column and row boundaries based on difficulty level
-    if difficulty_level.lower() == "easy":
-        cols = ["A", "B", "C", "D", "E", "F", "G", "H"]
-        rows = list(range(8))  # [0, 1, 2, 3, 4, 5, 6, 7]
-
-    elif difficulty_level.lower() == "medium":
-        cols = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "G"]
-        rows = list(range(10))
-
-    else:  # self.difficulty.lower == "hard"
-        cols = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "G", "K",
-                "L", "M", "N", "O"]
-        rows = list(range(15))
-
     # ================================= Game Loop =============================
     while not battleship_game.game_over():
         # Human's turn first
@@ -687,23 +950,20 @@ if __name__ == '__main__':
                 print("\nInvalid coordinates. Input a letter and a number, "
                       "separated by a colon, e.g. 1, F. Please try again.")
                 continue
-            # Check if coordinate has been guessed before
-            if tuple_guess in human_player.guesses:
-                print("\nYou have already guessed this coordinate. Try again.")
-                continue
-            # Check if coordinate is within bound
-            if int(tuple_guess[0]) < 0 or int(tuple_guess[0]) >= len(cols) or \
-                    tuple_guess[1].upper() not in cols:
-                print("\nCoordinates are invalid. Please try again.")
+            # Check if coordinate is on the board and has not been guessed
+            code = human_player.check_guess(tuple_guess)
+            if code != VALID:
+                print(MESSAGES[code])
                 continue
 
             valid_guess = True
-            # Add this valid guess to the list of guesses
-            human_player.guesses.append(tuple_guess)
+            # Add this valid guess to the list of guesses; from here on the
+            # guess is its cell id
+            guess = human_player.guess_coord(tuple_guess)
 
         # Modify target grid according to hit/miss
-        is_hit = computer_grid.is_hit(tuple_guess, "computer_player")
-        target_grid.mark_hit_or_miss(tuple_guess, is_hit, "computer_player")
+        is_hit = computer_grid.is_hit(guess, "computer_player")
+        target_grid.mark_hit_or_miss(guess, is_hit, "computer_player")
 
         display_grids(grid, target_grid)
 
@@ -711,14 +971,14 @@ if __name__ == '__main__':
         # sunken ship size if coordinate is a hit and a full ship has been sunk,
         # returns 0 if it's a hit but no full ship sunk
         if is_hit is not None:
-            print("\nIt's a hit at ", (int(tuple_guess[0]), tuple_guess[1].upper()), "!")
+            print("\nIt's a hit at ", config.coords[guess], "!")
             if is_hit != 0:
                 print("You have sunk a", is_hit, "x 1 ship!")
         else:
             print("\nIt's a miss.")
 
         print("Computer's remaining ships (for debugging purposes):")
-        print(computer_grid.ships)
+        print(computer_grid.ship_labels())
 
         # Check if game is over after human player's turn
         if battleship_game.game_over():
@@ -728,25 +988,21 @@ if __name__ == '__main__':
         input("\nThe computer will guess now. Press enter to Continue. ")
         print("\nComputer's turn: ")
 
-        # Simplest algorithm: random guesses
-        tuple_guess_computer = (random.choice(rows), random.choice(cols))
-        while tuple_guess_computer in computer_player.guesses:
-            tuple_guess_computer = (random.choice(rows), random.choice(cols))
-
-        # To implement: Harder algorithms - strategic guessing (guessing
-        # randomly, if hit,guess coordinates around that point)
+        # Strategic guessing: shoot where the remaining ships are most likely
+        # to be, and around hits until the ship is sunk
+        computer_guess = computer_strategy.next_shot()
 
-        computer_player.guesses.append(tuple_guess_computer)
-        is_hit = grid.is_hit(tuple_guess_computer, "human_player")
-        grid.mark_hit_or_miss(tuple_guess_computer, is_hit, "human_player")
+        computer_player.guess_coord(computer_guess)
+        is_hit = grid.is_hit(computer_guess, "human_player")
+        computer_strategy.record(computer_guess, is_hit)
+        grid.mark_hit_or_miss(computer_guess, is_hit, "human_player")
 
         display_grids(grid, target_grid)
 
-        print("\nComputer guesses", tuple_guess_computer)
+        print("\nComputer guesses", config.coords[computer_guess])
         if is_hit is not None:
             if is_hit != 0:
                 print("The computer has sunk your", is_hit, "x 1 ship!")
-            print("You've been hit at ", (int(tuple_guess_computer[0]),
-                                          tuple_guess_computer[1].upper()), "!")
+            print("You've been hit at ", config.coords[computer_guess], "!")
         else:
             print("Your ships are safe.")
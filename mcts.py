@@ -0,0 +1,705 @@
+"""Monte Carlo tree search computer player with a per-move time budget.
+
+MCTSStrategy follows the strategy interface of simulation.py. Each move it
+searches until a deadline, move_time seconds after the move was asked for
+(e.g. 0.005 on a server, 0.5 for analysis), and then shoots the best cell
+found so far. The clock is checked between search steps that each take
+about a tenth of a millisecond on a hard board, so a move normally ends
+within that of its budget. This is not a hard real-time bound: time the
+process spends descheduled or collecting garbage still adds to a move.
+
+The search draws hidden fleets consistent with what the shots so far
+revealed, with posterior.PosteriorEngine, along with their importance
+weights, and notes which of the shots considered from the current position
+would hit each one. A gamestate.GameState of each fleet at the current
+position is shared by FLEET_PLAYOUTS iterations, which undo their shots
+when they are done. One search iteration:
+    1. walks down the tree from the current position on the GameState:
+       each position picks a shot by PUCT, with the density scores of
+       ai.DensityStrategy as priors at the current position, and the result
+       of the shot (miss, hit or the size of the ship sunk) picks the next
+       position
+    2. adds the first position not in the tree yet, then fires hunt/target
+       rollout shots until horizon shots have been fired in all
+    3. credits every shot on the way with the discounted hits that followed
+       it, weighted by the importance weight of the fleet
+
+The tree is kept between moves: once a shot and its result are recorded,
+the subtree under them is where the next search starts.
+
+With a process pool, every move also runs searches in the workers until the
+same deadline, each from a fresh tree, and their statistics for the first
+shot are added to the local ones. Workers must run on the same machine, as
+deadlines are compared on the monotonic clock.
+
+Usage:
+    python mcts.py --games 20 --difficulty hard --move-time 5
+    python mcts.py --games 20 --difficulty hard --move-time 50 --workers 4
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import math
+import random
+import time
+from functools import lru_cache, partial
+
+from ai import DensityStrategy, sunk_cells
+from gamestate import GameState
+from main import Grid, Player, fleet_config, legal_placements
+from posterior import PosteriorEngine, position
+from rngstreams import derive_seed
+from simulation import (STRATEGIES, add_board_arguments, parse_board,
+                        play_game)
+
+# Seconds searched per move by default
+MOVE_TIME = 0.005
+# Shots fired per iteration, in the tree and the rollout together
+HORIZON = 10
+# Weight of a hit one shot later relative to a hit now
+DISCOUNT = 0.9
+# PUCT exploration constant
+EXPLORATION = 1.0
+# Shots considered from each position
+CANDIDATES = 8
+# Share of the move time workers stop early by, to send their results back
+WORKER_MARGIN = 0.2
+# Iterations played on each fleet drawn
+FLEET_PLAYOUTS = 2
+# Fleets' worth of weight the root's chances of a hit start from: the
+# density is close to the true chances while hunting, but only ranks the
+# cells next to the hits while targeting
+HUNT_PRIOR_SAMPLES = 100
+TARGET_PRIOR_SAMPLES = 4
+# Fleets' worth of weight the root's returns after a hit or a miss start from
+FUTURE_SAMPLES = 100
+# Random cells a rollout tries before listing the untried ones
+ROLLOUT_TRIES = 8
+
+
+@lru_cache(maxsize=None)
+def placement_starts(size, ship_size):
+    """Returns a dict mapping the mask of each placement of a ship_size x 1
+    ship to its (first cell, direction)
+    """
+    return {mask: (start, direction)
+            for mask, start, direction in legal_placements(size, ship_size)}
+
+
+@lru_cache(maxsize=None)
+def neighbours(size):
+    """Returns, for each cell, the tuple of the cells next to it"""
+    result = []
+    for cell in range(size * size):
+        row, col = divmod(cell, size)
+        result.append(tuple(
+            (row + dr) * size + col + dc
+            for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1))
+            if 0 <= row + dr < size and 0 <= col + dc < size))
+    return tuple(result)
+
+
+class _Node:
+    """A position in the search tree: the shots fired since the root and
+    their results.
+
+    - visits, weight: iterations through the position, and the sum of their
+      importance weights
+    - total: weighted sum of the returns from the position
+    - candidates: the shots considered from the position, best first, and
+      priors their PUCT priors (None for uniform); both set on the first
+      selection from the position
+    - actions: cell -> _Action for the shots tried from the position
+    """
+    __slots__ = ("visits", "weight", "total", "candidates", "priors",
+                 "actions")
+
+    def __init__(self, candidates=None):
+        self.visits = 0
+        self.weight = 0.0
+        self.total = 0.0
+        self.candidates = candidates
+        self.priors = None
+        self.actions = {}
+
+
+class _Action:
+    """A shot tried from a position, and the positions its results led to.
+
+    - visits, weight: iterations that fired the shot, and the sum of their
+      importance weights
+    - hit_weight: the part of weight from iterations in which it hit
+    - hit_future, miss_future: weighted sums of the returns from the next
+      position, after a hit and after a miss
+    - outcomes: result of the shot (None, 0 or a ship size) -> _Node
+    """
+    __slots__ = ("visits", "weight", "hit_weight", "hit_future",
+                 "miss_future", "outcomes")
+
+    def __init__(self):
+        self.visits = 0
+        self.weight = 0.0
+        self.hit_weight = 0.0
+        self.hit_future = 0.0
+        self.miss_future = 0.0
+        self.outcomes = {}
+
+
+class TreeSearch:
+    """Search tree rooted at the current position of one board, and what the
+    shots at that board have revealed so far.
+
+    The shots considered from the root are the candidates best cells of an
+    ai.DensityStrategy kept up to date alongside. Every fleet drawn tells
+    whether each of them holds a ship, so their chances of a hit are
+    estimated from all iterations, not only those that fire them, starting
+    from the density scores. What follows a hit and what follows a miss is
+    estimated from the iterations that fire each shot, starting from all
+    shots together. Deeper in the tree, positions with hits not yet sunk on
+    the way consider the cells next to them, and the others the root's
+    candidates not shot at yet.
+
+    :param config: BoardConfig of the board.
+    :param seed: Seed of the search's random numbers.
+    :param horizon: Shots fired per iteration.
+    :param discount: Weight of a hit one shot later relative to a hit now.
+    :param exploration: PUCT exploration constant.
+    :param candidates: Shots considered from each position.
+    """
+    def __init__(self, config, seed=None, horizon=HORIZON,
+                 discount=DISCOUNT, exploration=EXPLORATION,
+                 candidates=CANDIDATES):
+        self.size = config.size
+        self.fleet = config.fleet
+        self.rng = random.Random(seed)
+        self.engine = PosteriorEngine()
+        self.density = DensityStrategy(Player(Grid(config, verbose=False)),
+                                       self.rng)
+        self.horizon = horizon
+        self.discount = discount
+        self.exploration = exploration
+        self.candidates = candidates
+        self.remaining = list(config.fleet)
+        # Lengths of the ships still afloat
+        self.open_hits = set()
+        # Hit cells not yet attributed to a sunk ship
+        self.misses = 0
+        self.sunk = 0
+        # Cell masks of the misses and of the cells of sunk ships
+        self.shots = []
+        # Cells shot at, in order
+        self.root = _Node()
+        self.hit_priors = {}
+        # Root candidate -> chance of a hit by the density scores
+        self.prior_samples = HUNT_PRIOR_SAMPLES
+        # Fleets' worth of weight those chances count for
+        self.samples = 0
+        self.sample_weight = 0.0
+        self.seen = {}
+        # Fleets drawn from the root, the sum of their weights and, per root
+        # candidate, the sum of the weights of those with a ship there
+        for ship_size in set(config.fleet):
+            placement_starts(self.size, ship_size)
+        neighbours(self.size)
+
+    def record(self, cell, result):
+        """Records the result of a shot, as returned by Grid.is_hit, and
+        moves the root to the position it leads to
+        """
+        action = self.root.actions.get(cell)
+        child = action.outcomes.get(result) if action is not None else None
+        self.root = child if child is not None else _Node()
+        self.samples = 0
+        self.sample_weight = 0.0
+        self.seen = {}
+        self.density.record(cell, result)
+        self.shots.append(cell)
+        if result is None:
+            self.misses |= 1 << cell
+            return
+        self.open_hits.add(cell)
+        if result != 0:
+            for sunk_cell in sunk_cells(cell, result, self.open_hits,
+                                        self.size):
+                self.open_hits.discard(sunk_cell)
+                self.sunk |= 1 << sunk_cell
+            if result in self.remaining:
+                self.remaining.remove(result)
+
+    def run(self, deadline=None, iterations=None):
+        """Searches until the monotonic clock reaches deadline or after
+        iterations iterations, whichever comes first. Returns the number of
+        iterations run.
+
+        The clock is checked before every iteration, and also after the
+        root is prepared and after each fleet is drawn, so a search ends
+        at most one of those steps after the deadline.
+        """
+        if deadline is None and iterations is None:
+            raise ValueError("A search needs a deadline or an iteration "
+                             "limit")
+        self.__prepare_root()
+        hits = 0
+        for cell in self.open_hits:
+            hits |= 1 << cell
+        start = position(self.size, self.remaining, hits, self.misses,
+                         self.sunk)
+        done = 0
+        while iterations is None or done < iterations:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            state, weight = self.__determinize(start)
+            if state is None:
+                done += 1
+                continue
+            # Play several iterations on each fleet, rewinding the state to
+            # the root position in between
+            root_shots = state.shots
+            for _ in range(FLEET_PLAYOUTS):
+                if iterations is not None and done >= iterations or \
+                        deadline is not None and \
+                        time.monotonic() >= deadline:
+                    break
+                self.__iterate(state, weight)
+                done += 1
+                while state.shots > root_shots:
+                    state.undo_shot()
+        return done
+
+    def __prepare_root(self):
+        """Sets the root's candidates, their chances of a hit by the density
+        scores and their priors, keeping the shots a reused root has already
+        tried
+        """
+        density = self.density
+        scores = density.scores()
+        untried = density.untried
+        best = sorted(untried, key=lambda cell: -scores[cell])
+        candidates = best[:self.candidates]
+        candidates += [cell for cell in self.root.actions
+                       if cell not in candidates]
+        total = sum(scores[cell] for cell in untried)
+        if scores is density.density:
+            # Hunting: the density spreads the unhit ship cells over the
+            # board
+            expected = sum(self.remaining) - len(self.open_hits)
+            self.prior_samples = HUNT_PRIOR_SAMPLES
+        else:
+            # Targeting: about one of the cells next to the hits holds a ship
+            expected = 1
+            self.prior_samples = TARGET_PRIOR_SAMPLES
+        self.hit_priors = {
+            cell: min(1.0, scores[cell] * expected / total) if total else 0.0
+            for cell in candidates}
+        chosen = sum(scores[cell] for cell in candidates)
+        self.root.candidates = candidates
+        self.root.priors = [scores[cell] / chosen if chosen
+                            else 1.0 / len(candidates)
+                            for cell in candidates]
+
+    def __determinize(self, start):
+        """Draws a hidden fleet consistent with the root position. Returns a
+        GameState of it at the root position and the fleet's importance
+        weight, or (None, 0.0) at a dead end.
+        """
+        drawn = self.engine.draw(start, self.rng)
+        if drawn is None:
+            return None, 0.0
+        ships, weight = drawn
+        placements = []
+        for ship_size, mask in ships:
+            first, direction = placement_starts(self.size, ship_size)[mask]
+            placements.append((first, ship_size, direction))
+
+        state = GameState(self.size, placements, self.shots)
+        ship_index = state.ship_index
+        seen = self.seen
+        for cell in self.root.candidates:
+            if ship_index[cell]:
+                seen[cell] = seen.get(cell, 0.0) + weight
+        self.samples += 1
+        self.sample_weight += weight
+        return state, weight
+
+    def __iterate(self, state, weight):
+        """Plays one iteration on a state at the root position"""
+        targets = list(self.open_hits)
+        path = []
+        rewards = []
+        node = self.root
+        while len(rewards) < self.horizon and state.ships_left:
+            if node is self.root:
+                cell = self.__select_root(state)
+            else:
+                cell = self.__select(node, state, targets)
+            if cell is None:
+                break
+            action = node.actions.get(cell)
+            if action is None:
+                action = node.actions[cell] = _Action()
+            path.append((node, action))
+            result = self.__shoot(state, cell, targets, rewards)
+            child = action.outcomes.get(result)
+            if child is None:
+                # New position: the last one added to the tree
+                child = action.outcomes[result] = _Node(
+                    None if targets else
+                    [other for other in node.candidates if other != cell])
+                node = child
+                break
+            node = child
+        leaf = node
+        self.__rollout(state, targets, rewards)
+
+        returns = [0.0] * (len(rewards) + 1)
+        for i in range(len(rewards) - 1, -1, -1):
+            returns[i] = rewards[i] + self.discount * returns[i + 1]
+        for depth, (node, action) in enumerate(path):
+            node.visits += 1
+            node.weight += weight
+            node.total += weight * returns[depth]
+            action.visits += 1
+            action.weight += weight
+            if rewards[depth]:
+                action.hit_weight += weight
+                action.hit_future += weight * returns[depth + 1]
+            else:
+                action.miss_future += weight * returns[depth + 1]
+        leaf.visits += 1
+        leaf.weight += weight
+        leaf.total += weight * returns[len(path)]
+
+    def __select_root(self, state):
+        """Returns the PUCT choice of shot from the root, valued by
+        root_values()
+        """
+        root = self.root
+        if not root.visits:
+            # The first iteration tries the density's choice
+            return root.candidates[0] if root.candidates else None
+        values = self.root_values(self.root_statistics())
+        scale = self.exploration * math.sqrt(root.visits)
+        actions = root.actions
+        best = None
+        best_score = -1.0
+        for cell, prior in zip(root.candidates, root.priors):
+            action = actions.get(cell)
+            visits = action.visits if action is not None else 0
+            score = values[cell] + scale * prior / (1 + visits)
+            if score > best_score:
+                best = cell
+                best_score = score
+        return best
+
+    def __select(self, node, state, targets):
+        """Returns the PUCT choice of shot from node, or None if node has
+        never been visited or has nothing to shoot at
+        """
+        if not node.visits:
+            return None
+        shot = state.shot
+        if node.candidates is None:
+            node.candidates = self.__target_candidates(shot, targets)
+        candidates = node.candidates
+        priors = node.priors
+        scale = self.exploration * math.sqrt(node.visits)
+        uniform = 1.0 / len(candidates) if candidates else 0.0
+        # Shots not tried yet are valued at the position's mean return
+        value = node.total / node.weight
+        discount = self.discount
+        actions = node.actions
+        best = None
+        best_score = -1.0
+        for i, cell in enumerate(candidates):
+            if shot[cell]:
+                continue
+            prior = priors[i] if priors is not None else uniform
+            action = actions.get(cell)
+            if action is None:
+                score = value + scale * prior
+            else:
+                score = (action.hit_weight + discount * (
+                    action.hit_future + action.miss_future)) / \
+                    action.weight + scale * prior / (1 + action.visits)
+            if score > best_score:
+                best = cell
+                best_score = score
+        return best
+
+    def __target_candidates(self, shot, targets):
+        """Returns the untried cells next to targets, those next to the most
+        targets first
+        """
+        around = neighbours(self.size)
+        counts = {}
+        for target in targets:
+            for cell in around[target]:
+                if not shot[cell]:
+                    counts[cell] = counts.get(cell, 0) + 1
+        return sorted(counts, key=lambda cell: -counts[cell])
+
+    def __shoot(self, state, cell, targets, rewards):
+        """Fires at cell, appends the reward and updates the target cells"""
+        result = state.apply_shot(cell)
+        if result is None:
+            rewards.append(0)
+            return None
+        rewards.append(1)
+        targets.append(cell)
+        if result:
+            # The drawn fleet tells which hits the sunk ship covered
+            ship_id = state.ship_index[cell]
+            targets[:] = [target for target in targets
+                          if state.ship_index[target] != ship_id]
+        return result
+
+    def __rollout(self, state, targets, rewards):
+        """Fires hunt/target shots until horizon shots have been fired or the
+        fleet has sunk
+        """
+        rng = self.rng
+        shot = state.shot
+        around = neighbours(self.size)
+        cells = len(shot)
+        while len(rewards) < self.horizon and state.ships_left:
+            cell = None
+            if targets:
+                options = [next_to for target in targets
+                           for next_to in around[target]
+                           if not shot[next_to]]
+                if options:
+                    cell = options[int(rng.random() * len(options))]
+            if cell is None:
+                for _ in range(ROLLOUT_TRIES):
+                    candidate = int(rng.random() * cells)
+                    if not shot[candidate]:
+                        cell = candidate
+                        break
+                else:
+                    cell = rng.choice([candidate for candidate in range(cells)
+                                       if not shot[candidate]])
+            self.__shoot(state, cell, targets, rewards)
+
+    def root_statistics(self):
+        """Returns (fleets drawn, sum of their weights, cells), where cells
+        maps each root candidate to [weight of the fleets with a ship there,
+        visits, weight, hit_weight, hit_future, miss_future] of its _Action
+        (zeros if it was never tried)
+        """
+        actions = self.root.actions
+        seen = self.seen
+        cells = {}
+        for cell in self.root.candidates or ():
+            action = actions.get(cell)
+            if action is None:
+                cells[cell] = [seen.get(cell, 0.0), 0, 0.0, 0.0, 0.0, 0.0]
+            else:
+                cells[cell] = [seen.get(cell, 0.0), action.visits,
+                               action.weight, action.hit_weight,
+                               action.hit_future, action.miss_future]
+        return self.samples, self.sample_weight, cells
+
+    def root_values(self, statistics):
+        """Returns a dict mapping each cell of root statistics to its
+        expected discounted hits: its chance of a hit times one plus what
+        follows a hit, plus what follows a miss. Each estimate starts from
+        a few fleets' worth of a prior guess: the density's chance of a hit,
+        and what follows over all the shots tried from the root.
+        """
+        samples, sample_weight, cells = statistics
+        mean_weight = sample_weight / samples if samples else 1.0
+        prior_weight = self.prior_samples * mean_weight
+        future_weight = FUTURE_SAMPLES * mean_weight
+        hit_weight = hit_future = miss_weight = miss_future = 0.0
+        for _, _, weight, hits, after_hit, after_miss in cells.values():
+            hit_weight += hits
+            hit_future += after_hit
+            miss_weight += weight - hits
+            miss_future += after_miss
+        # Returns after a hit and after a miss, over all shots
+        after_hit_mean = hit_future / hit_weight if hit_weight else 0.0
+        after_miss_mean = miss_future / miss_weight if miss_weight else 0.0
+        discount = self.discount
+        values = {}
+        for cell, (seen, _, weight, hits, after_hit, after_miss) in \
+                cells.items():
+            chance = (seen + prior_weight * self.hit_priors.get(cell, 0.0)) / \
+                (sample_weight + prior_weight)
+            if_hit = (after_hit + future_weight * after_hit_mean) / \
+                (hits + future_weight)
+            if_miss = (after_miss + future_weight * after_miss_mean) / \
+                (weight - hits + future_weight)
+            values[cell] = chance * (1 + discount * if_hit) + \
+                (1 - chance) * discount * if_miss
+        return values
+
+    def best_shot(self, statistics=None):
+        """Returns the root candidate with the highest root_values(), which
+        without any iteration is the density's choice.
+
+        :param statistics: Root statistics to choose from, by default
+            root_statistics().
+        """
+        if statistics is None:
+            statistics = self.root_statistics()
+        if not statistics[2]:
+            return self.density.next_shot()
+        values = self.root_values(statistics)
+        return max(values, key=values.get)
+
+
+def search_worker(size, fleet, history, seed, deadline, iterations,
+                  horizon=HORIZON, discount=DISCOUNT,
+                  exploration=EXPLORATION, candidates=CANDIDATES):
+    """Runs a search from a fresh tree in a pool worker and returns its
+    root_statistics()
+
+    :param history: (cell, result) of every shot so far, in order.
+    :param deadline: Monotonic clock time to stop at, or None.
+    """
+    search = TreeSearch(fleet_config(size, fleet), seed, horizon, discount,
+                        exploration, candidates)
+    for cell, result in history:
+        search.record(cell, result)
+    search.run(deadline, iterations)
+    return search.root_statistics()
+
+
+def merge_statistics(statistics, other):
+    """Returns the sum of two root statistics, keeping only the cells of the
+    first
+    """
+    samples, sample_weight, cells = statistics
+    other_samples, other_weight, other_cells = other
+    merged = {}
+    for cell, values in cells.items():
+        more = other_cells.get(cell)
+        merged[cell] = values if more is None else \
+            [value + extra for value, extra in zip(values, more)]
+    return samples + other_samples, sample_weight + other_weight, merged
+
+
+class MCTSStrategy:
+    """Monte Carlo tree search strategy with a time budget per move.
+
+    :param player: Player the strategy shoots for.
+    :param rng: Random number generator; the search draws its seed from it
+        once.
+    :param move_time: Seconds to search per move, or None to search for
+        iterations iterations instead.
+    :param iterations: Iteration limit per move, e.g. for reproducible
+        searches with move_time None. Raises ValueError if both are None.
+    :param pool: concurrent.futures.ProcessPoolExecutor to run extra
+        searches in, or None.
+    :param workers: Searches submitted to the pool per move.
+    """
+    def __init__(self, player, rng, move_time=MOVE_TIME, iterations=None,
+                 pool=None, workers=0, horizon=HORIZON, discount=DISCOUNT,
+                 exploration=EXPLORATION, candidates=CANDIDATES):
+        if move_time is None and iterations is None:
+            raise ValueError("MCTSStrategy needs a move_time or an "
+                             "iteration limit")
+        self.search = TreeSearch(player.grid.config, rng.getrandbits(64),
+                                 horizon, discount, exploration, candidates)
+        self.move_time = move_time
+        self.iterations = iterations
+        self.pool = pool
+        self.workers = workers if pool is not None else 0
+        self.history = []
+        # (cell, result) of every shot so far, for the pool workers
+        self.settings = (horizon, discount, exploration, candidates)
+
+    def next_shot(self):
+        deadline = None
+        if self.move_time is not None:
+            deadline = time.monotonic() + self.move_time
+        search = self.search
+        futures = []
+        if self.workers:
+            worker_deadline = None if deadline is None else \
+                deadline - self.move_time * WORKER_MARGIN
+            for _ in range(self.workers):
+                futures.append(self.pool.submit(
+                    search_worker, search.size, search.fleet, self.history,
+                    search.rng.getrandbits(64), worker_deadline,
+                    self.iterations, *self.settings))
+        search.run(deadline, self.iterations)
+        statistics = search.root_statistics()
+        if futures:
+            timeout = None if deadline is None else \
+                max(0.0, deadline - time.monotonic())
+            done, _ = concurrent.futures.wait(futures, timeout)
+            for future in futures:
+                if future in done and future.exception() is None:
+                    statistics = merge_statistics(statistics,
+                                                  future.result())
+                else:
+                    # Too late for this move
+                    future.cancel()
+        return search.best_shot(statistics)
+
+    def record(self, cell, result):
+        self.search.record(cell, result)
+        self.history.append((cell, result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play games of the MCTS "
+                                                 "player against another "
+                                                 "strategy.")
+    parser.add_argument("--games", type=int, default=20)
+    add_board_arguments(parser)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--opponent", default="density",
+                        choices=sorted(STRATEGIES))
+    parser.add_argument("--move-time", type=float, default=MOVE_TIME * 1000,
+                        help="Milliseconds to search per move")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Processes to run extra searches in")
+    args = parser.parse_args()
+    try:
+        config = parse_board(args.difficulty, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+
+    with contextlib.ExitStack() as stack:
+        pool = None
+        if args.workers:
+            pool = stack.enter_context(
+                concurrent.futures.ProcessPoolExecutor(args.workers))
+            # Start the workers before the first move is timed
+            list(pool.map(neighbours, [config.size] * args.workers))
+        latencies = []
+
+        class TimedMCTS(MCTSStrategy):
+            def next_shot(self):
+                start = time.perf_counter()
+                cell = super().next_shot()
+                latencies.append(time.perf_counter() - start)
+                return cell
+
+        mcts = partial(TimedMCTS, move_time=args.move_time / 1000, pool=pool,
+                       workers=args.workers)
+        seed = args.seed if args.seed is not None else \
+            random.SystemRandom().getrandbits(64)
+        shots = []
+        wins = 0
+        for index in range(args.games):
+            result = play_game(mcts, STRATEGIES[args.opponent], config,
+                               derive_seed(seed, index))
+            wins += result.winner == "a"
+            shots.append(result.shots_a if result.winner == "a"
+                         else result.shots_b)
+
+    latencies.sort()
+    print("Games played:", args.games)
+    print("MCTS win rate: %.3f" % (wins / args.games))
+    print("Mean shots to win: %.2f" % (sum(shots) / len(shots)))
+    print("Move time: median %.2f ms, p99 %.2f ms, max %.2f ms" % (
+        latencies[len(latencies) // 2] * 1000,
+        latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000,
+        latencies[-1] * 1000))
+
+
+if __name__ == '__main__':
+    main()
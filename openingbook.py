@@ -0,0 +1,285 @@
+"""Opening book and placement statistics learned from logged games.
+
+OpeningBook aggregates, per board size and fleet, how often human players
+put a ship on each cell and how often they shoot at each cell early in a
+game. From those, each board's BookEntry precomputes once, when the book is
+loaded or built:
+    - an opening: cells humans most often cover with ships, spread out, which
+      the computer fires at first until it scores a hit
+    - a placement distribution for the computer's own fleet, weighting every
+      legal placement by the chance that humans leave all of its cells alone
+      early in a game
+
+Books are JSON files built from game logs (see gamelog.py) in which player a
+is human, as in the logs server.py writes of matches against the computer.
+Until a board has MIN_GAMES games behind it, its entry changes nothing.
+
+Usage:
+    python openingbook.py build games.log --out book.json
+    python openingbook.py show book.json --difficulty hard
+"""
+import argparse
+import json
+import os
+import random
+from functools import lru_cache
+
+from ai import DensityStrategy
+from gamelog import read_log
+from main import fleet_config, legal_placements
+from simulation import add_board_arguments, parse_board
+
+# Games a board needs before its statistics are used
+MIN_GAMES = 20
+
+
+def board_key(config):
+    """Returns the key of a board in a book, e.g. "15:2,3,3,4,5" """
+    return "%d:%s" % (config.size, ",".join(map(str, config.fleet)))
+
+
+def _cells(mask):
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() - 1)
+        mask ^= low
+    return cells
+
+
+class BookEntry:
+    """Statistics of one board, and the opening and placement weights
+    derived from them.
+
+    - placed: per cell, the number of games in which a human ship covered it
+    - shot_early: per cell, the number of games in which the human shot at it
+      within their first size * size // 4 shots
+    """
+    def __init__(self, config, games=0, placed=None, shot_early=None):
+        cells = config.size * config.size
+        self.config = config
+        self.games = games
+        self.placed = placed or [0] * cells
+        self.shot_early = shot_early or [0] * cells
+        self.opening = ()
+        # Cells for the computer to fire at first, best first
+        self.weights = {}
+        # Ship size -> weight of each placement of legal_placements, or
+        # nothing while there are too few games
+        self.prepare()
+
+    def add_game(self, placements, shots):
+        """Adds one game of a human player.
+
+        :param placements: (first cell, ship size, direction) of their ships.
+        :param shots: The cells they shot at, in order.
+        """
+        size = self.config.size
+        for start, ship_size, direction in placements:
+            step = 1 if direction == "h" else size
+            for cell in range(start, start + ship_size * step, step):
+                self.placed[cell] += 1
+        for cell in shots[:size * size // 4]:
+            self.shot_early[cell] += 1
+        self.games += 1
+
+    def prepare(self):
+        """Recomputes the opening and placement weights from the counts"""
+        self.opening = ()
+        self.weights = {}
+        if self.games < MIN_GAMES:
+            return
+        size = self.config.size
+
+        # Most often covered cells first, skipping the neighbours of cells
+        # already chosen, as one hit there would end the opening anyway
+        opening = []
+        taken = set()
+        for cell in sorted(range(size * size),
+                           key=lambda cell: (-self.placed[cell], cell)):
+            if len(opening) == size or not self.placed[cell]:
+                break
+            if cell in taken:
+                continue
+            opening.append(cell)
+            row, col = divmod(cell, size)
+            taken.update((row + dr) * size + col + dc
+                         for dr, dc in ((0, 0), (-1, 0), (1, 0), (0, -1),
+                                        (0, 1))
+                         if 0 <= row + dr < size and 0 <= col + dc < size)
+        self.opening = tuple(opening)
+
+        # Chance that a cell escapes the human's early shots, with one
+        # pseudo-game each way so no cell is ever certain
+        spared = [1 - (count + 1) / (self.games + 2)
+                  for count in self.shot_early]
+        for ship_size in set(self.config.fleet):
+            weights = []
+            for mask, _, _ in legal_placements(size, ship_size):
+                weight = 1.0
+                for cell in _cells(mask):
+                    weight *= spared[cell]
+                weights.append(weight)
+            self.weights[ship_size] = weights
+
+    def place_ship(self, grid, ship_size, rng=random):
+        """Places a ship_size x 1 ship on grid, drawn from the legal
+        placements in proportion to their weights (uniformly while there are
+        too few games). Returns the grid, or None if the ship no longer fits.
+        """
+        weights = self.weights.get(ship_size)
+        if weights is None:
+            return grid.place_random_ship(ship_size, rng)
+        occupied = grid.occupied
+        placements = legal_placements(grid.size, ship_size)
+        legal = [i for i, (mask, _, _) in enumerate(placements)
+                 if not mask & occupied]
+        if not legal:
+            return None
+        i = rng.choices(legal, [weights[i] for i in legal])[0]
+        _, start, direction = placements[i]
+        grid.place_ship_at(ship_size, start, direction)
+        return grid
+
+    def to_dict(self):
+        return {"games": self.games, "placed": self.placed,
+                "shot_early": self.shot_early}
+
+
+class OpeningBook:
+    """Per-board BookEntries, keyed by board_key"""
+    def __init__(self):
+        self.entries = {}
+
+    def entry(self, config):
+        """Returns the BookEntry of a board, or None if the book has none"""
+        return self.entries.get(board_key(config))
+
+    def add_record(self, record, sides="a"):
+        """Adds a logged game.
+
+        :param record: gamelog.GameRecord.
+        :param sides: Players of the game who are human: "a", "b" or "ab".
+        """
+        config = fleet_config(record.size, tuple(
+            ship_size for _, ship_size, _ in record.placements_a))
+        key = board_key(config)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = BookEntry(config)
+        # Player a fires the even shots
+        shots = [cell for cell, _ in record.shots]
+        if "a" in sides:
+            entry.add_game(record.placements_a, shots[0::2])
+        if "b" in sides:
+            entry.add_game(record.placements_b, shots[1::2])
+
+    def prepare(self):
+        for entry in self.entries.values():
+            entry.prepare()
+
+    def save(self, path):
+        with open(path, "w") as out:
+            json.dump({key: entry.to_dict()
+                       for key, entry in self.entries.items()}, out)
+
+    @classmethod
+    def load(cls, path):
+        book = cls()
+        with open(path) as book_file:
+            data = json.load(book_file)
+        for key, counts in data.items():
+            size, _, fleet = key.partition(":")
+            config = fleet_config(int(size), tuple(
+                int(ship_size) for ship_size in fleet.split(",")))
+            book.entries[key] = BookEntry(config, counts["games"],
+                                          counts["placed"],
+                                          counts["shot_early"])
+        return book
+
+
+@lru_cache(maxsize=None)
+def load_book(path):
+    """Returns the OpeningBook at path, read and prepared on the first call
+    only, so matches look up their entry without touching the disk
+    """
+    return OpeningBook.load(path)
+
+
+class OpeningStrategy:
+    """DensityStrategy that fires the book's opening first, until the first
+    hit. Built as OpeningStrategy(player, rng, entry) with the BookEntry of
+    the board; without an entry it is a plain DensityStrategy.
+    """
+    __slots__ = ("inner", "player", "opening", "next_opening")
+
+    def __init__(self, player, rng, entry=None):
+        self.inner = DensityStrategy(player, rng)
+        self.player = player
+        self.opening = entry.opening if entry is not None else ()
+        # The entry's shared tuple, never copied
+        self.next_opening = 0
+        # Index of the first opening cell not fired yet
+
+    def next_shot(self):
+        opening = self.opening
+        while self.next_opening < len(opening):
+            cell = opening[self.next_opening]
+            self.next_opening += 1
+            if not self.player.guessed[cell]:
+                return cell
+        return self.inner.next_shot()
+
+    def record(self, cell, result):
+        if result is not None:
+            self.next_opening = len(self.opening)
+        self.inner.record(cell, result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or show an opening "
+                                                 "book.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Add game logs to a book")
+    build.add_argument("logs", nargs="+")
+    build.add_argument("--out", required=True,
+                       help="Book file, updated if it exists")
+    build.add_argument("--sides", default="a", choices=["a", "b", "ab"],
+                       help="Players of the logged games who are human")
+    show = commands.add_parser("show", help="Print a board's statistics")
+    show.add_argument("book")
+    add_board_arguments(show)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        book = OpeningBook.load(args.out) if os.path.exists(args.out) \
+            else OpeningBook()
+        for path in args.logs:
+            for record in read_log(path):
+                book.add_record(record, args.sides)
+        book.save(args.out)
+        for key, entry in sorted(book.entries.items()):
+            print("%-20s %d games" % (key, entry.games))
+        return
+
+    try:
+        config = parse_board(args.difficulty, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+    entry = load_book(args.book).entry(config)
+    if entry is None:
+        print("No games for " + board_key(config))
+        return
+    print("%s: %d games" % (board_key(config), entry.games))
+    peak = max(entry.placed) or 1
+    print("Ship frequency (0-9):")
+    for row in config.rows:
+        print(config.row_labels[row] + " ".join(
+            str(entry.placed[row * config.size + col] * 9 // peak)
+            for col in range(config.size)))
+    print("Opening: " + " ".join("%d,%s" % config.coords[cell]
+                                 for cell in entry.opening))
+
+
+if __name__ == '__main__':
+    main()
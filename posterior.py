@@ -0,0 +1,352 @@
+"""Posterior probability that each cell of a board holds a ship, given what
+the shots fired at it so far have revealed.
+
+A Position is what the shooter knows: the ships still afloat, the hits not
+yet attributed to a sunk ship, the misses, and the cells of sunk ships. Every
+fleet configuration consistent with it (each hit covered, no ship on a miss
+or sunk cell, no live ship made only of hits) is equally likely, and the
+probability of a cell is the fraction of them with a ship on it.
+
+Configurations are enumerated exactly when there are few enough of them, as
+on small boards or late in a game. Otherwise they are drawn by importance
+sampling without rejection: ships are placed through the lowest uncovered
+hit first, then the rest on free cells, each drawn uniformly from the
+placements still legal, and every sample is weighted by the number of
+choices it had at each step. That makes the weighted samples unbiased for
+the uniform distribution over consistent configurations.
+
+Usage:
+    engine = PosteriorEngine(seed=1)
+    probabilities = engine.probabilities(grid_position(target_grid, [3, 5]))
+"""
+import random
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+from main import legal_placements
+
+# size: board size; remaining: sorted tuple of the lengths of the ships still
+# afloat; hits, misses, sunk: cell bitmasks as in Grid (hits excludes the
+# cells of sunk ships)
+Position = namedtuple("Position", ["size", "remaining", "hits", "misses",
+                                   "sunk"])
+
+# Samples drawn before deciding whether to enumerate a position exactly
+PILOT_SAMPLES = 32
+
+
+def position(size, remaining, hits=0, misses=0, sunk=0):
+    """Returns the Position for a board, with remaining as any iterable of
+    ship lengths
+    """
+    return Position(size, tuple(sorted(remaining, reverse=True)), hits,
+                    misses, sunk)
+
+
+def grid_position(grid, remaining, sunk=0):
+    """Returns the Position of a target grid marked by
+    Grid.mark_hit_or_miss, given the lengths of the ships still afloat and
+    the mask of the cells of the ships sunk so far
+    """
+    return position(grid.size, remaining, grid.hits & ~sunk, grid.misses,
+                    sunk)
+
+
+class TooManyConfigurations(Exception):
+    """Raised internally when exact enumeration goes over its limit"""
+
+
+@lru_cache(maxsize=None)
+def _tables(size, ship_size):
+    """Returns the placement tables of a ship_size x 1 ship:
+        - masks of horizontal placements by first cell (None if out of bounds)
+        - masks of vertical placements by first cell
+        - mask of the first cells of in-bounds horizontal placements
+        - mask of the first cells of in-bounds vertical placements
+        - masks of the placements covering each cell
+    """
+    horizontal = [None] * (size * size)
+    vertical = [None] * (size * size)
+    starts_h = starts_v = 0
+    covering = [[] for _ in range(size * size)]
+    for mask, start, direction in legal_placements(size, ship_size):
+        if direction == "h":
+            horizontal[start] = mask
+            starts_h |= 1 << start
+        else:
+            vertical[start] = mask
+            starts_v |= 1 << start
+        cells = mask
+        while cells:
+            low = cells & -cells
+            covering[low.bit_length() - 1].append(mask)
+            cells ^= low
+    return (tuple(horizontal), tuple(vertical), starts_h, starts_v,
+            tuple(tuple(masks) for masks in covering))
+
+
+def _starts(free, size, ship_size):
+    """Returns the masks of the first cells of the horizontal and vertical
+    placements of a ship_size x 1 ship that lie entirely on free cells
+    """
+    _, _, starts_h, starts_v, _ = _tables(size, ship_size)
+    horizontal = vertical = free
+    for i in range(1, ship_size):
+        horizontal &= free >> i
+        vertical &= free >> (i * size)
+    return horizontal & starts_h, vertical & starts_v
+
+
+def _bit_count(mask):
+    return bin(mask).count("1")
+
+
+def _nth_bit(mask, n):
+    """Returns the position of the n-th lowest set bit of mask"""
+    for _ in range(n):
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
+
+
+def _hit_choices(position, cell, allowed, free, occupied, ships):
+    """Returns the (ship length, count, mask) choices for a live ship through
+    cell: each legal placement of each length, with the number of ships of
+    that length still to place
+    """
+    choices = []
+    for ship_size in set(ships):
+        count = ships.count(ship_size)
+        for mask in _tables(position.size, ship_size)[4][cell]:
+            if not mask & ~allowed and not mask & occupied and mask & free:
+                choices.append((ship_size, count, mask))
+    return choices
+
+
+class PosteriorEngine:
+    """Computes and caches the ship probability of every cell of a Position.
+
+    :param samples: Monte Carlo samples per position.
+    :param exact_limit: Largest number of configurations to enumerate
+        exactly before falling back to sampling. 0 always samples.
+    :param seed: Seed for sampling. With a seed, the result for a position
+        does not depend on the positions queried before it.
+    :param cache_size: Number of positions whose results are kept.
+    """
+    def __init__(self, samples=2000, exact_limit=20000, seed=None,
+                 cache_size=4096):
+        self.samples = samples
+        self.exact_limit = exact_limit
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+    def probabilities(self, position):
+        """Returns a tuple with, for each cell, the probability that it holds
+        a ship: 1.0 for hits and sunk cells, 0.0 for misses. Every cell is 0.0
+        if no configuration fits the position.
+
+        A few pilot samples come first: their mean weight estimates the
+        number of configurations, which decides between exact enumeration and
+        sampling the rest.
+        """
+        result = self.cache.get(position)
+        if result is not None:
+            self.cache.move_to_end(position)
+            return result
+        rng = self.__rng(position)
+        counts = [0.0] * (position.size * position.size)
+        pilot = min(PILOT_SAMPLES, self.samples)
+        total = self.__accumulate(position, rng, pilot, counts)
+        if self.exact_limit and total / pilot <= self.exact_limit:
+            result = self.exact(position)
+        if result is None:
+            total += self.__accumulate(position, rng, self.samples - pilot,
+                                       counts)
+            result = self.__normalize(position, counts, total)
+        self.cache[position] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def exact(self, position):
+        """Returns the probabilities by enumerating every consistent
+        configuration, or None if there are more than exact_limit of them
+        """
+        cells = position.size * position.size
+        counts = [0] * cells
+        try:
+            total = self.__enumerate(position, counts)
+        except TooManyConfigurations:
+            return None
+        return self.__normalize(position, counts, total)
+
+    def sample(self, position, samples=None):
+        """Returns the probabilities estimated from importance samples"""
+        counts = [0.0] * (position.size * position.size)
+        total = self.__accumulate(position, self.__rng(position),
+                                  samples or self.samples, counts)
+        return self.__normalize(position, counts, total)
+
+    def draw(self, position, rng=None):
+        """Draws one fleet configuration consistent with position. Returns
+        (ships, weight), with ships a list of (ship size, mask) and weight
+        its importance weight, or None at a dead end.
+
+        Configurations are not drawn uniformly: averages over draws must be
+        weighted by weight to be unbiased.
+        """
+        drawn = self.__draw(position, rng or self.rng)
+        if drawn is None:
+            return None
+        _, weight, ships = drawn
+        return ships, weight
+
+    def __rng(self, position):
+        if self.seed is not None:
+            return random.Random(hash((self.seed,) + tuple(position)))
+        return self.rng
+
+    def __accumulate(self, position, rng, samples, counts):
+        """Adds the weights of samples configurations to the counts of their
+        ship cells. Returns the total weight.
+        """
+        total = 0.0
+        for _ in range(samples):
+            drawn = self.__draw(position, rng)
+            if drawn is None:
+                continue
+            occupied, weight, _ = drawn
+            total += weight
+            while occupied:
+                low = occupied & -occupied
+                counts[low.bit_length() - 1] += weight
+                occupied ^= low
+        return total
+
+    def __draw(self, position, rng):
+        """Draws one configuration. Returns (mask of its ship cells, weight,
+        list of (ship size, mask) of its ships) or None at a dead end.
+        """
+        size = position.size
+        cells = size * size
+        allowed = ((1 << cells) - 1) & ~(position.misses | position.sunk)
+        free = allowed & ~position.hits
+        occupied = 0
+        uncovered = position.hits
+        ships = list(position.remaining)
+        placed = []
+        weight = 1.0
+
+        # Ships through the hits. The ship covering the lowest uncovered hit
+        # of a configuration is unique, so each configuration has one path
+        while uncovered:
+            cell = (uncovered & -uncovered).bit_length() - 1
+            choices = _hit_choices(position, cell, allowed, free, occupied,
+                                   ships)
+            total = sum(count for _, count, _ in choices)
+            if not total:
+                return None
+            weight *= total
+            pick = rng.randrange(total)
+            for ship_size, count, mask in choices:
+                if pick < count:
+                    break
+                pick -= count
+            ships.remove(ship_size)
+            placed.append((ship_size, mask))
+            occupied |= mask
+            uncovered &= ~mask
+
+        # The other ships, in order, on free cells
+        free &= ~occupied
+        for ship_size in ships:
+            horizontal, vertical = _starts(free, size, ship_size)
+            n_horizontal = _bit_count(horizontal)
+            n = n_horizontal + _bit_count(vertical)
+            if not n:
+                return None
+            weight *= n
+            tables = _tables(size, ship_size)
+            if n * 4 >= cells:
+                # Plenty of placements: draw a first cell and direction
+                # until one is legal, which is uniform over the legal ones
+                while True:
+                    start = rng.randrange(2 * cells)
+                    if start < cells:
+                        if horizontal >> start & 1:
+                            mask = tables[0][start]
+                            break
+                    elif vertical >> (start - cells) & 1:
+                        mask = tables[1][start - cells]
+                        break
+            else:
+                pick = rng.randrange(n)
+                if pick < n_horizontal:
+                    mask = tables[0][_nth_bit(horizontal, pick)]
+                else:
+                    mask = tables[1][_nth_bit(vertical, pick - n_horizontal)]
+            placed.append((ship_size, mask))
+            occupied |= mask
+            free &= ~mask
+        return occupied, weight, placed
+
+    def __enumerate(self, position, counts):
+        """Adds, for every consistent configuration, 1 to the count of each
+        of its ship cells. Returns the number of configurations.
+        """
+        size = position.size
+        allowed = ((1 << size * size) - 1) & ~(position.misses | position.sunk)
+        free = allowed & ~position.hits
+        limit = self.exact_limit
+        found = [0]
+
+        def leaf(occupied, multiplicity):
+            found[0] += multiplicity
+            if found[0] > limit:
+                raise TooManyConfigurations
+            while occupied:
+                low = occupied & -occupied
+                counts[low.bit_length() - 1] += multiplicity
+                occupied ^= low
+
+        def place_free(free_cells, occupied, ships, multiplicity):
+            if not ships:
+                leaf(occupied, multiplicity)
+                return
+            ship_size = ships[0]
+            horizontal_masks, vertical_masks = _tables(size, ship_size)[:2]
+            for starts, masks in zip(_starts(free_cells, size, ship_size),
+                                     (horizontal_masks, vertical_masks)):
+                while starts:
+                    low = starts & -starts
+                    mask = masks[low.bit_length() - 1]
+                    place_free(free_cells & ~mask, occupied | mask, ships[1:],
+                               multiplicity)
+                    starts ^= low
+
+        def cover_hits(uncovered, occupied, ships, multiplicity):
+            if not uncovered:
+                place_free(free & ~occupied, occupied, ships, multiplicity)
+                return
+            cell = (uncovered & -uncovered).bit_length() - 1
+            for ship_size, count, mask in _hit_choices(
+                    position, cell, allowed, free, occupied, ships):
+                rest = list(ships)
+                rest.remove(ship_size)
+                cover_hits(uncovered & ~mask, occupied | mask, rest,
+                           multiplicity * count)
+
+        cover_hits(position.hits, 0, list(position.remaining), 1)
+        return found[0]
+
+    def __normalize(self, position, counts, total):
+        known = position.hits | position.sunk
+        shot = known | position.misses
+        result = []
+        for cell, count in enumerate(counts):
+            if shot >> cell & 1:
+                result.append(1.0 if known >> cell & 1 else 0.0)
+            else:
+                result.append(count / total if total else 0.0)
+        return tuple(result)
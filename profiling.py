@@ -0,0 +1,266 @@
+"""Opt-in instrumentation of the game: call counters and timers around each
+phase, exported as JSON or Prometheus text, and a cProfile self-play mode.
+
+Instrumentation works by wrapping the methods listed in INSTRUMENTED while a
+Profiler is active and restoring the originals afterwards, so the game code
+has no hooks in it and costs nothing extra when profiling is off:
+
+    with Profiler() as profiler:
+        simulate(1000, difficulty="hard")
+    print(profiler.prometheus())
+
+Phases:
+    - setup: grid construction and ship placement
+    - validation: placement checks and guess bookkeeping
+    - shot: hit detection and marking
+    - game_over: end-of-game checks
+    - render: building and printing boards
+    - ai: computer move selection and result recording
+
+Usage:
+    python profiling.py --games 500 --difficulty hard --json metrics.json
+    python profiling.py --strategy-a density --cprofile game.prof
+"""
+import argparse
+import cProfile
+import functools
+import json
+import pstats
+import sys
+import time
+
+import main as battleship
+from ai import DensityStrategy, PosteriorStrategy
+from main import Game, Grid, Player
+from mcts import MCTSStrategy
+from simulation import STRATEGIES, add_board_arguments, parse_board, simulate
+
+# (phase, owner, attribute) of each instrumented function; owner is a class
+# or a module
+INSTRUMENTED = [
+    ("setup", Grid, "__init__"),
+    ("setup", Grid, "place_ship"),
+    ("setup", Grid, "place_random_ship"),
+    ("setup", Grid, "place_ship_at"),
+    ("validation", Grid, "check_placement"),
+    ("validation", Player, "check_guess"),
+    ("validation", Player, "has_guessed"),
+    ("validation", Player, "guess_coord"),
+    ("shot", Grid, "is_hit"),
+    ("shot", Grid, "mark_hit_or_miss"),
+    ("game_over", Game, "game_over"),
+    ("render", Grid, "render_lines"),
+    ("render", Grid, "print_grid"),
+    ("render", battleship, "display_grids"),
+    ("ai", DensityStrategy, "next_shot"),
+    ("ai", DensityStrategy, "record"),
+    ("ai", PosteriorStrategy, "next_shot"),
+    ("ai", PosteriorStrategy, "record"),
+    ("ai", MCTSStrategy, "next_shot"),
+    ("ai", MCTSStrategy, "record"),
+]
+
+
+def shot_outcome(is_hit):
+    """Names the counter for a Grid.is_hit result"""
+    if is_hit is None:
+        return "misses"
+    return "sinks" if is_hit else "hits"
+
+
+def game_over_outcome(over):
+    return "games_finished" if over else None
+
+
+# Attribute -> function naming the counter to bump for a call's result
+OUTCOMES = {
+    (Grid, "is_hit"): shot_outcome,
+    (Game, "game_over"): game_over_outcome,
+}
+
+
+class Profiler:
+    """Counts and times calls to the INSTRUMENTED functions while active.
+
+    - timers: "Owner.attribute" -> [phase, calls, total seconds, max seconds]
+    - phase_totals: phase -> [calls, total seconds], counting only the
+      outermost call when instrumented functions of a phase nest, as
+      print_grid calling render_lines does
+    - counters: event name -> count, e.g. "hits" or "games_finished"
+
+    Only one profiler can be active at a time, and its counts are not
+    locked, so calls made at the same moment from several threads may be
+    undercounted. Use as a context manager, or call start() and stop().
+    """
+    active = None
+
+    def __init__(self):
+        self.timers = {}
+        self.phase_totals = {}
+        self.depth = {}
+        # Phase -> number of its instrumented calls in progress
+        self.counters = {}
+        self.originals = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        if Profiler.active is not None:
+            raise RuntimeError("A profiler is already active")
+        Profiler.active = self
+        for phase, owner, attribute in INSTRUMENTED:
+            function = getattr(owner, attribute)
+            self.originals.append((owner, attribute, function))
+            setattr(owner, attribute,
+                    self.__timed(phase, owner.__name__ + "." + attribute,
+                                 function, OUTCOMES.get((owner, attribute))))
+
+    def stop(self):
+        for owner, attribute, function in reversed(self.originals):
+            setattr(owner, attribute, function)
+        self.originals = []
+        Profiler.active = None
+
+    def count(self, name, n=1):
+        """Adds n to a counter"""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def __timed(self, phase, name, function, outcome):
+        timer = self.timers.setdefault(name, [phase, 0, 0.0, 0.0])
+        total = self.phase_totals.setdefault(phase, [0, 0.0])
+        depth = self.depth
+        depth.setdefault(phase, 0)
+        counters = self.counters
+        clock = time.perf_counter
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            depth[phase] += 1
+            start = clock()
+            try:
+                result = function(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                depth[phase] -= 1
+                timer[1] += 1
+                timer[2] += elapsed
+                if elapsed > timer[3]:
+                    timer[3] = elapsed
+                if not depth[phase]:
+                    total[0] += 1
+                    total[1] += elapsed
+            if outcome is not None:
+                event = outcome(result)
+                if event is not None:
+                    counters[event] = counters.get(event, 0) + 1
+            return result
+        return timed
+
+    def phases(self):
+        """Returns phase -> [calls, total seconds] for the phases called"""
+        return {phase: total for phase, total in self.phase_totals.items()
+                if total[0]}
+
+    def to_dict(self):
+        return {
+            "functions": {name: {"phase": phase, "calls": calls,
+                                 "seconds": seconds, "max_seconds": longest}
+                          for name, (phase, calls, seconds, longest)
+                          in self.timers.items() if calls},
+            "phases": {phase: {"calls": calls, "seconds": seconds}
+                       for phase, (calls, seconds) in self.phases().items()},
+            "counters": dict(self.counters),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, sort_keys=True)
+
+    def prometheus(self, prefix="battleship"):
+        """Returns the metrics in the Prometheus text exposition format"""
+        lines = ["# HELP %s_calls_total Calls to instrumented functions."
+                 % prefix,
+                 "# TYPE %s_calls_total counter" % prefix]
+        for name, (phase, calls, _, _) in sorted(self.timers.items()):
+            if calls:
+                lines.append('%s_calls_total{phase="%s",function="%s"} %d'
+                             % (prefix, phase, name, calls))
+        lines += ["# HELP %s_seconds_total Time spent in instrumented "
+                  "functions." % prefix,
+                  "# TYPE %s_seconds_total counter" % prefix]
+        for name, (phase, calls, seconds, _) in sorted(self.timers.items()):
+            if calls:
+                lines.append('%s_seconds_total{phase="%s",function="%s"} %.9f'
+                             % (prefix, phase, name, seconds))
+        lines += ["# HELP %s_events_total Game events." % prefix,
+                  "# TYPE %s_events_total counter" % prefix]
+        for name, n in sorted(self.counters.items()):
+            lines.append('%s_events_total{event="%s"} %d' % (prefix, name, n))
+        return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Profile headless self-play games.")
+    parser.add_argument("--games", type=int, default=200)
+    add_board_arguments(parser)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--strategy-a", default="density",
+                        choices=sorted(STRATEGIES))
+    parser.add_argument("--strategy-b", default="density",
+                        choices=sorted(STRATEGIES))
+    parser.add_argument("--json", help="Write the metrics to this JSON file")
+    parser.add_argument("--prometheus",
+                        help="Write the metrics to this file in Prometheus "
+                             "text format")
+    parser.add_argument("--cprofile", nargs="?", const="-", metavar="FILE",
+                        help="Run under cProfile instead of the phase timers "
+                             "and print the top functions, or save the "
+                             "profile to FILE")
+    parser.add_argument("--top", type=int, default=25,
+                        help="Functions to print with --cprofile")
+    args = parser.parse_args()
+    try:
+        config = parse_board(args.difficulty, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+
+    def play():
+        simulate(args.games, STRATEGIES[args.strategy_a],
+                 STRATEGIES[args.strategy_b], config, args.seed)
+
+    if args.cprofile:
+        profile = cProfile.Profile()
+        profile.runcall(play)
+        if args.cprofile == "-":
+            pstats.Stats(profile, stream=sys.stdout).sort_stats(
+                "tottime").print_stats(args.top)
+        else:
+            profile.dump_stats(args.cprofile)
+        return
+
+    start = time.perf_counter()
+    with Profiler() as profiler:
+        play()
+    elapsed = time.perf_counter() - start
+    for phase, (calls, seconds) in sorted(profiler.phases().items(),
+                                          key=lambda item: -item[1][1]):
+        print("%-12s %10d calls %10.3f s %8.2f us/call"
+              % (phase, calls, seconds, seconds / calls * 1e6))
+    print("%-12s %27.3f s" % ("wall", elapsed))
+    for name, n in sorted(profiler.counters.items()):
+        print("%-16s %d" % (name, n))
+    if args.json:
+        with open(args.json, "w") as out:
+            out.write(profiler.to_json())
+    if args.prometheus:
+        with open(args.prometheus, "w") as out:
+            out.write(profiler.prometheus())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Seeded random number streams for reproducible games.
+
+Every game draws all of its random numbers (computer ship placement, random
+and tie-breaking shots) from its own generator, built from a 64-bit game
+seed. Game seeds are derived from a master seed and the game's index alone,
+by hashing, so game 999,999,999 of a run can be replayed without playing
+or drawing anything for the games before it, and workers that play
+disjoint ranges of indices get independent streams whatever the split:
+
+    seed = derive_seed(master, 999999999)
+    result = play_game(DensityStrategy, DensityStrategy, "hard", seed)
+
+Two backends produce a game's generator from its seed:
+    - python: random.Random, the default
+    - numpy: BlockRandom, a random.Random whose numbers come from a
+      numpy.random.Generator in pre-drawn blocks. The two backends give
+      different games for the same seed.
+"""
+import hashlib
+import random
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the numpy backend
+    np = None
+
+PYTHON, NUMPY = "python", "numpy"
+BACKENDS = (PYTHON, NUMPY)
+
+# Numbers drawn from the numpy generator at a time
+BLOCK_SIZE = 4096
+
+_MASK64 = (1 << 64) - 1
+
+
+def derive_seed(seed, *path):
+    """Returns the 64-bit seed of the substream of seed at path, a sequence
+    of non-negative ints such as (game index,) or (pairing, game index).
+    Different paths give unrelated seeds.
+    """
+    data = struct.pack("<%dQ" % (1 + len(path)), seed & _MASK64,
+                       *(i & _MASK64 for i in path))
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(),
+                          "little")
+
+
+def master_seed(seed=None):
+    """Returns seed, or a fresh random 64-bit master seed if it is None"""
+    return random.SystemRandom().getrandbits(64) if seed is None else seed
+
+
+def game_rng(seed, backend=PYTHON):
+    """Returns a new generator for a game seed"""
+    if backend == PYTHON:
+        return random.Random(seed)
+    if backend == NUMPY:
+        return BlockRandom(seed)
+    raise ValueError("Unknown random backend: " + str(backend))
+
+
+class BlockRandom(random.Random):
+    """random.Random drawing its numbers from a numpy.random.Generator.
+
+    Floats for random() and 64-bit words for getrandbits() are drawn
+    BLOCK_SIZE at a time, and every other method of random.Random (choice,
+    randrange, shuffle, choices, ...) is built on those two, so a strategy
+    or placement cannot tell the difference. Requires numpy.
+
+    :param seed: Seed of the numpy generator, e.g. a game seed.
+    :param block: Numbers drawn per refill.
+    """
+    def __init__(self, seed=None, block=BLOCK_SIZE):
+        if np is None:
+            raise ImportError("BlockRandom requires numpy")
+        self.block = block
+        super().__init__(seed)
+
+    def seed(self, a=None, version=2):
+        self.generator = np.random.default_rng(a)
+        self.floats = self.words = ()
+        self.float_pos = self.word_pos = 0
+        # Current block of each kind and the next number to hand out
+        self.float_start = self.word_start = None
+        # State of the generator just before each block was drawn, so
+        # getstate can describe a block by where it starts
+
+    def random(self):
+        pos = self.float_pos
+        if pos == len(self.floats):
+            self.float_start = self.generator.bit_generator.state
+            self.floats = self.generator.random(self.block).tolist()
+            pos = 0
+        self.float_pos = pos + 1
+        return self.floats[pos]
+
+    def choice(self, seq):
+        # One float per pick, as random.Random does when it has no
+        # getrandbits, instead of a rejection loop over getrandbits calls
+        if not seq:
+            raise IndexError("Cannot choose from an empty sequence")
+        return seq[int(self.random() * len(seq))]
+
+    def getrandbits(self, k):
+        if k <= 0:
+            if k < 0:
+                raise ValueError("number of bits must be non-negative")
+            return 0
+        bits = 0
+        for _ in range((k + 63) // 64):
+            pos = self.word_pos
+            if pos == len(self.words):
+                self.word_start = self.generator.bit_generator.state
+                self.words = self.__draw_words()
+                pos = 0
+            self.word_pos = pos + 1
+            bits = bits << 64 | self.words[pos]
+        return bits >> (-k % 64)
+
+    def __draw_words(self):
+        return self.generator.integers(0, 1 << 64, self.block,
+                                       dtype=np.uint64,
+                                       endpoint=False).tolist()
+
+    def getstate(self):
+        """Returns the state as the generator's state, and where each block
+        in use starts and how far into it the stream is; the blocks
+        themselves are drawn again by setstate
+        """
+        return (self.block, self.generator.bit_generator.state,
+                self.float_start, self.float_pos if self.floats else 0,
+                self.word_start, self.word_pos if self.words else 0,
+                self.gauss_next)
+
+    def setstate(self, state):
+        (self.block, current, self.float_start, self.float_pos,
+         self.word_start, self.word_pos, self.gauss_next) = state
+        bit_generator = self.generator.bit_generator
+        self.floats = self.words = ()
+        if self.float_start is not None:
+            bit_generator.state = self.float_start
+            self.floats = self.generator.random(self.block).tolist()
+        if self.word_start is not None:
+            bit_generator.state = self.word_start
+            self.words = self.__draw_words()
+        bit_generator.state = current
@@ -0,0 +1,500 @@
+"""Networked battleship server hosting many concurrent matches on one
+asyncio event loop.
+
+Each connection plays one match at a time, against the computer or against
+another connection. A match is a plain state object; building a match and
+the computer's move selection run off the event loop, in an executor.
+
+Line protocol (one command per line, coordinates written as row,letter):
+
+    Client                      Server
+    PLAY computer|human [DIFF]  WAIT (until an opponent joins), then
+                                PLACE <ship type> for each ship
+    PLACE 3,B h|v               PLACE <next ship type>, or WAIT / TURN once
+                                the whole fleet is placed
+    PLACE RANDOM                places the rest of the fleet at random
+    SHOT 3,B                    HIT 3,B | MISS 3,B | SUNK 3,B <size>,
+                                then WIN, or WAIT until the opponent has shot
+    SUSPEND                     SUSPENDED <id> (matches against the computer,
+                                when a store is configured)
+    RESUME <id>                 RESUMED, then PLACE <ship type> or TURN
+    QUIT                        BYE
+
+    Sent to a player when the opponent shoots:  INCOMING 3,B HIT|MISS|SUNK
+    Sent when it is the player's turn:          TURN
+    Sent at the end of a match:                 WIN | LOSE | OPPONENT_LEFT
+    Sent for a rejected command:                ERR <reason>
+
+DIFF is easy (default), medium, hard or a custom size such as 30x30.
+
+Suspended matches are saved in a snapshot.MatchStore and dropped from
+memory until they are resumed, from any connection that knows their id.
+
+With --log, every finished match is appended to a game log (see gamelog.py),
+the first seat as player a, so matches against the computer log the human as
+player a for openingbook.py. With --book, the computer places its fleet and
+opens fire using that opening book. With --move-time, the computer shoots
+with mcts.MCTSStrategy instead, searching that many milliseconds per move.
+
+With --metrics, the server profiles itself (see profiling.py) and rewrites
+a Prometheus text file with its metrics every --metrics-interval seconds,
+for a node_exporter textfile collector or similar to pick up.
+
+Usage:
+    python server.py --port 5555 --store matches.db
+    python server.py --metrics /var/lib/node_exporter/battleship.prom
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+from array import array
+
+from gamelog import GameLogWriter, GameRecord, result_code
+from main import (OUT_OF_BOUNDS, SHIP_IN_THE_WAY, START_OCCUPIED, VALID,
+                  Game, Grid, Player, board_config)
+from mcts import MCTSStrategy
+from openingbook import OpeningStrategy, load_book
+from profiling import Profiler
+from snapshot import MatchStore, guess_results, restore
+
+
+class Seat:
+    """One side of a match: a player, its grid, and the connection it is
+    played from (None for the computer).
+    """
+    __slots__ = ("grid", "player", "writer", "ships_placed", "match",
+                 "strategy")
+
+    def __init__(self, player, writer=None):
+        self.grid = player.grid
+        self.player = player
+        self.writer = writer
+        self.ships_placed = len(self.grid.placements)
+        self.match = None
+        self.strategy = None
+
+    @property
+    def fleet_placed(self):
+        return self.ships_placed == len(self.grid.config.fleet)
+
+    def send(self, line):
+        if self.writer is not None:
+            self.writer.write((line + "\n").encode())
+
+
+class Match:
+    """State of one match between two seats. Seat 0 shoots first."""
+    __slots__ = ("seats", "turn", "over", "shots", "game")
+
+    def __init__(self, seats):
+        self.seats = seats
+        self.turn = 0
+        self.over = False
+        self.shots = array("H")
+        # Every shot so far, in order, packed as in gamelog.py:
+        # cell << 2 | result code
+        self.game = Game(seats[0].player, seats[1].player, verbose=False)
+        for seat in seats:
+            seat.match = self
+
+    @property
+    def started(self):
+        return all(seat.fleet_placed for seat in self.seats)
+
+    def opponent(self, seat):
+        return self.seats[1] if seat is self.seats[0] else self.seats[0]
+
+
+# Reason sent with ERR for each failed placement check of main.py
+PLACEMENT_ERRORS = {
+    OUT_OF_BOUNDS: "ship out of bounds",
+    START_OCCUPIED: "coordinate already taken",
+    SHIP_IN_THE_WAY: "ship in the way",
+}
+
+
+class BattleshipServer:
+    """Accepts connections and runs their matches.
+
+    :param executor: concurrent.futures executor for computer moves. None
+        uses the event loop's default thread pool.
+    :param store: snapshot.MatchStore suspended matches are kept in. None
+        disables SUSPEND and RESUME.
+    :param book: openingbook.OpeningBook the computer plays from, or None.
+    :param log: gamelog.GameLogWriter finished matches are appended to, or
+        None.
+    :param move_time: Seconds the computer searches per move with
+        mcts.MCTSStrategy, or None to play openingbook.OpeningStrategy.
+    """
+    def __init__(self, executor=None, seed=None, store=None, book=None,
+                 log=None, move_time=None):
+        self.executor = executor
+        self.rng = random.Random(seed)
+        self.store = store
+        self.book = book
+        self.log = log
+        self.move_time = move_time
+        self.waiting = {}
+        # Board name -> seat waiting for a human opponent on that board
+        self.matches = 0
+        # Number of matches in progress
+
+    async def handle_client(self, reader, writer):
+        seat = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                words = line.decode(errors="replace").split()
+                if not words:
+                    continue
+                command = words[0].upper()
+                if command == "QUIT":
+                    writer.write(b"BYE\n")
+                    break
+                elif command == "PLAY":
+                    seat = await self.play(seat, words[1:], writer)
+                elif command == "RESUME":
+                    seat = await self.resume(seat, words[1:], writer)
+                elif seat is None or seat.match is None:
+                    writer.write(b"ERR no match in progress\n")
+                elif command == "PLACE":
+                    self.place(seat, words[1:])
+                elif command == "SHOT":
+                    await self.shot(seat, words[1:])
+                elif command == "SUSPEND":
+                    self.suspend(seat)
+                else:
+                    writer.write(b"ERR unknown command\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.leave(seat)
+            writer.close()
+
+    async def play(self, seat, args, writer):
+        """Starts a new match for a connection and returns its seat"""
+        if seat is not None and (seat.match is not None or
+                                 seat in self.waiting.values()):
+            writer.write(b"ERR already playing\n")
+            return seat
+        if not args or args[0].lower() not in ("computer", "human"):
+            writer.write(b"ERR expected PLAY computer|human [difficulty]\n")
+            return seat
+        against_computer = args[0].lower() == "computer"
+        # Large custom boards take a while to set up, so the seats are built
+        # in the executor. The seed is drawn here, keeping self.rng's draws in
+        # the order the commands arrived.
+        seed = self.rng.getrandbits(64) if against_computer else None
+        try:
+            seat, computer = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.new_seats,
+                args[1] if len(args) > 1 else "easy", writer, seed)
+        except ValueError as error:
+            writer.write(("ERR %s\n" % error).encode())
+            return seat
+
+        config = seat.grid.config
+        if computer is not None:
+            self.start(Match([seat, computer]))
+        elif config.name in self.waiting:
+            self.start(Match([self.waiting.pop(config.name), seat]))
+        else:
+            self.waiting[config.name] = seat
+            seat.send("WAIT")
+        return seat
+
+    def new_seats(self, spec, writer, seed=None):
+        """Returns the seat of a connection starting a match on the board
+        spec, and the computer's seat with its fleet placed, or None if seed
+        is None for a match against another connection.
+        """
+        config = board_config(spec)
+        seat = Seat(Player(Grid(config, verbose=False)), writer)
+        if seed is None:
+            return seat, None
+        rng = random.Random(seed)
+        computer = Seat(Player(Grid(config, verbose=False)))
+        entry = self.book_entry(config)
+        computer.grid.place_random_fleet(
+            rng, entry.place_ship if entry is not None else None)
+        computer.ships_placed = len(config.fleet)
+        computer.strategy = self.computer_strategy(
+            computer.player, entry, rng.getrandbits(64))
+        return seat, computer
+
+    def book_entry(self, config):
+        return self.book.entry(config) if self.book is not None else None
+
+    def computer_strategy(self, player, entry, seed):
+        """Returns a new strategy for the computer player of a match"""
+        rng = random.Random(seed)
+        if self.move_time is not None:
+            return MCTSStrategy(player, rng, self.move_time)
+        return OpeningStrategy(player, rng, entry)
+
+    def start(self, match):
+        self.matches += 1
+        for seat in match.seats:
+            seat.send("PLACE " + seat.grid.config.ship_types[0])
+
+    def suspend(self, seat):
+        """Saves a match against the computer to the store and ends it"""
+        match = seat.match
+        if self.store is None:
+            seat.send("ERR suspending is not enabled")
+            return
+        if match.opponent(seat).strategy is None:
+            seat.send("ERR only matches against the computer can be suspended")
+            return
+        match_id = self.rng.getrandbits(63)
+        while match_id in self.store:
+            match_id = self.rng.getrandbits(63)
+        self.store.put(match_id, match.game)
+        match.over = True
+        self.matches -= 1
+        seat.match = match.opponent(seat).match = None
+        seat.send("SUSPENDED %d" % match_id)
+
+    async def resume(self, seat, args, writer):
+        """Restores a suspended match for a connection and returns its seat"""
+        if seat is not None and (seat.match is not None or
+                                 seat in self.waiting.values()):
+            writer.write(b"ERR already playing\n")
+            return seat
+        if self.store is None:
+            writer.write(b"ERR suspending is not enabled\n")
+            return seat
+        match_id = int(args[0]) if args and args[0].isdigit() else None
+        data = (self.store.get_bytes(match_id) if match_id is not None
+                else None)
+        if data is None:
+            writer.write(b"ERR no such suspended match\n")
+            return seat
+        self.store.delete(match_id)
+
+        match = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.restored_match, data, writer,
+            self.rng.getrandbits(64))
+        seat = match.seats[0]
+        self.matches += 1
+        seat.send("RESUMED")
+        if seat.fleet_placed:
+            seat.send("TURN")
+        else:
+            seat.send("PLACE " +
+                      seat.grid.config.ship_types[seat.ships_placed])
+        return seat
+
+    def restored_match(self, data, writer, seed):
+        """Returns the match of a snapshot, the connection in seat 0. Like
+        new_seats, this runs in the executor.
+        """
+        game = restore(data)[0]
+        seat = Seat(game.human_player, writer)
+        computer = Seat(game.computer_player)
+        # The computer's strategy is rebuilt by replaying its shots
+        computer.strategy = self.computer_strategy(
+            computer.player, self.book_entry(seat.grid.config), seed)
+        computer_shots = guess_results(computer.player, seat.grid)
+        for cell, is_hit in computer_shots:
+            computer.strategy.record(cell, is_hit)
+        match = Match([seat, computer])
+        # The human shoots first and the computer answers every shot
+        for human_shot, computer_shot in zip(
+                guess_results(seat.player, computer.grid), computer_shots):
+            for cell, is_hit in (human_shot, computer_shot):
+                match.shots.append(cell << 2 | result_code(is_hit))
+        return match
+
+    def place(self, seat, args):
+        grid = seat.grid
+        if seat.fleet_placed:
+            seat.send("ERR fleet already placed")
+            return
+        if args and args[0].upper() == "RANDOM":
+            for ship_size in grid.config.fleet[seat.ships_placed:]:
+                if grid.place_random_ship(ship_size, self.rng) is None:
+                    seat.send("ERR no room left for a %dx1 ship" % ship_size)
+                    return
+                seat.ships_placed += 1
+        else:
+            cell = grid.parse_coord(args[0]) if args else None
+            direction = args[1].lower() if len(args) > 1 else None
+            if cell is None or direction not in ("h", "v"):
+                seat.send("ERR expected PLACE row,letter h|v")
+                return
+            ship_size = grid.config.fleet[seat.ships_placed]
+            code = grid.place_ship_at(ship_size, cell, direction)
+            if code != VALID:
+                seat.send("ERR " + PLACEMENT_ERRORS[code])
+                return
+            seat.ships_placed += 1
+
+        if not seat.fleet_placed:
+            seat.send("PLACE " + grid.config.ship_types[seat.ships_placed])
+            return
+        match = seat.match
+        if not match.started:
+            seat.send("WAIT")
+            return
+        match.seats[match.turn].send("TURN")
+        match.opponent(match.seats[match.turn]).send("WAIT")
+
+    async def shot(self, seat, args):
+        match = seat.match
+        if not match.started or match.seats[match.turn] is not seat:
+            seat.send("ERR not your turn")
+            return
+        cell = seat.grid.parse_coord(args[0]) if args else None
+        if cell is None:
+            seat.send("ERR expected SHOT row,letter")
+            return
+        if seat.player.guessed[cell]:
+            seat.send("ERR already guessed")
+            return
+
+        self.resolve(match, seat, cell)
+        opponent = match.opponent(seat)
+        # The computer answers straight away; its move is computed in the
+        # executor so that other matches keep running meanwhile
+        while not match.over and opponent.strategy is not None:
+            loop = asyncio.get_running_loop()
+            cell = await loop.run_in_executor(self.executor,
+                                              opponent.strategy.next_shot)
+            if match.over:  # the human left while the move was computed
+                return
+            is_hit = self.resolve(match, opponent, cell)
+            opponent.strategy.record(cell, is_hit)
+            if match.seats[match.turn] is not opponent:
+                break
+
+    def resolve(self, match, seat, cell):
+        """Applies seat's shot at cell and tells both sides the result"""
+        target = match.opponent(seat)
+        seat.player.guess_coord(cell)
+        is_hit = target.grid.is_hit(cell, "computer_player")
+        target.grid.mark_hit_or_miss(cell, is_hit, "computer_player")
+        match.shots.append(cell << 2 | result_code(is_hit))
+
+        text = "%d,%s" % target.grid.coord(cell)
+        if is_hit is None:
+            seat.send("MISS " + text)
+            target.send("INCOMING %s MISS" % text)
+        elif is_hit == 0:
+            seat.send("HIT " + text)
+            target.send("INCOMING %s HIT" % text)
+        else:
+            seat.send("SUNK %s %d" % (text, is_hit))
+            target.send("INCOMING %s SUNK %d" % (text, is_hit))
+
+        if match.game.game_over():
+            match.over = True
+            self.matches -= 1
+            if self.log is not None:
+                self.log.append(GameRecord(
+                    None, target.grid.size,
+                    tuple(match.seats[0].grid.placements),
+                    tuple(match.seats[1].grid.placements),
+                    tuple((packed >> 2, packed & 3)
+                          for packed in match.shots)))
+            seat.send("WIN")
+            target.send("LOSE")
+            seat.match = target.match = None
+        else:
+            match.turn = 1 - match.turn
+            target.send("TURN")
+            seat.send("WAIT")
+        return is_hit
+
+    def leave(self, seat):
+        """Cleans up after a connection closes"""
+        if seat is None:
+            return
+        if self.waiting.get(seat.grid.config.name) is seat:
+            del self.waiting[seat.grid.config.name]
+        match = seat.match
+        if match is not None and not match.over:
+            match.over = True
+            self.matches -= 1
+            opponent = match.opponent(seat)
+            opponent.send("OPPONENT_LEFT")
+            opponent.match = None
+        seat.match = None
+
+    async def serve(self, host="127.0.0.1", port=5555, metrics=None,
+                    metrics_interval=15):
+        """Serves until cancelled.
+
+        :param metrics: File the active Profiler's metrics are written to
+            every metrics_interval seconds, or None.
+        """
+        server = await asyncio.start_server(self.handle_client, host, port)
+        if metrics is not None:
+            writer = asyncio.ensure_future(write_metrics(metrics,
+                                                         metrics_interval))
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                if metrics is not None:
+                    writer.cancel()
+
+
+async def write_metrics(path, interval):
+    """Rewrites path with the active Profiler's metrics every interval
+    seconds. The file is replaced in one step, so readers never see it half
+    written.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        with open(path + ".tmp", "w") as out:
+            out.write(Profiler.active.prometheus())
+        os.replace(path + ".tmp", path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the battleship server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--store", default=None,
+                        help="File to keep suspended matches in (default: "
+                             "suspending is disabled)")
+    parser.add_argument("--metrics", default=None,
+                        help="Profile the server and write Prometheus "
+                             "metrics to this file")
+    parser.add_argument("--metrics-interval", type=float, default=15,
+                        help="Seconds between metrics writes")
+    parser.add_argument("--log", default=None,
+                        help="Append finished matches to this game log")
+    parser.add_argument("--book", default=None,
+                        help="Opening book for the computer player")
+    parser.add_argument("--move-time", type=float, default=None,
+                        help="Milliseconds the computer searches per move "
+                             "with Monte Carlo tree search (default: no "
+                             "search)")
+    args = parser.parse_args()
+    move_time = args.move_time / 1000 if args.move_time is not None else None
+
+    book = load_book(args.book) if args.book is not None else None
+    with contextlib.ExitStack() as stack:
+        store = log = None
+        if args.store is not None:
+            store = stack.enter_context(MatchStore(args.store))
+        if args.log is not None:
+            log = stack.enter_context(GameLogWriter(args.log))
+        if args.metrics is not None:
+            stack.enter_context(Profiler())
+        asyncio.run(BattleshipServer(seed=args.seed, store=store, book=book,
+                                     log=log, move_time=move_time)
+                    .serve(args.host, args.port, args.metrics,
+                           args.metrics_interval))
+
+
+if __name__ == '__main__':
+    main()
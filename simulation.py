@@ -0,0 +1,198 @@
+"""Headless self-play for the console battleship game.
+
+Runs complete games between two computer strategies without any input() or
+print() calls, so Grid, Player and Game can be exercised at scale.
+
+Usage:
+    python simulation.py --games 10000 --difficulty medium --seed 1
+    python simulation.py --strategy-a density --strategy-b random
+    python simulation.py --difficulty 40x40 --fleet 2,3,3,4,5,6,8
+    python simulation.py --seed 1 --first 999999999 --games 1 --rng numpy
+"""
+import argparse
+import time
+from collections import namedtuple
+
+from ai import DensityStrategy, PosteriorStrategy
+from gamelog import GameLogWriter, GameRecord, result_code
+from main import (DIFFICULTIES, BoardConfig, Game, Grid, Player,
+                  board_config)
+from rngstreams import BACKENDS, PYTHON, derive_seed, game_rng, master_seed
+
+# Compact record of a finished game. winner is "a" or "b"; shots_a and
+# shots_b are the number of shots each side fired.
+GameResult = namedtuple("GameResult", ["seed", "winner", "shots_a", "shots_b"])
+
+
+class RandomStrategy:
+    """The original computer guesser from the console game: picks a
+    coordinate uniformly at random from those not guessed yet.
+
+    A strategy is created once per game with the Player it shoots for and the
+    game's random number generator. next_shot() returns a cell id and
+    record() is told the result of Grid.is_hit for that shot.
+    """
+    __slots__ = ("player", "rng")
+
+    def __init__(self, player, rng):
+        self.player = player
+        self.rng = rng
+
+    def next_shot(self):
+        return self.player.random_untried(self.rng)
+
+    def record(self, cell, result):
+        pass
+
+
+# Strategies selectable by name from the command line
+STRATEGIES = {
+    "random": RandomStrategy,
+    "density": DensityStrategy,
+    "posterior": PosteriorStrategy,
+}
+
+
+def play_game(strategy_a, strategy_b, difficulty="easy", seed=None,
+              log=None, backend=PYTHON):
+    """Play one headless game between two strategy classes and return a
+    GameResult. Player a shoots first. The same seed and backend always
+    produce the same game.
+
+    :param difficulty: Difficulty name, custom size such as "30x30", or
+        BoardConfig.
+    :param log: Optional gamelog.GameLogWriter the game is appended to.
+    :param backend: Random number backend of rngstreams.py.
+    """
+    rng = game_rng(seed, backend)
+
+    grid_a = Grid(difficulty, verbose=False)
+    grid_b = Grid(difficulty, verbose=False)
+    grid_a.place_random_fleet(rng)
+    grid_b.place_random_fleet(rng)
+
+    player_a = Player(grid_a)
+    player_b = Player(grid_b)
+    game = Game(player_a, player_b, verbose=False)
+
+    # Each side: (player, strategy, opponent's grid)
+    sides = [(player_a, strategy_a(player_a, rng), grid_b),
+             (player_b, strategy_b(player_b, rng), grid_a)]
+    shots = [0, 0]
+    logged_shots = []
+    turn = 0
+    while True:
+        player, strategy, target = sides[turn]
+        cell = strategy.next_shot()
+        player.guess_coord(cell)
+        is_hit = target.is_hit(cell, "computer_player")
+        target.mark_hit_or_miss(cell, is_hit, "computer_player")
+        strategy.record(cell, is_hit)
+        shots[turn] += 1
+        if log is not None:
+            logged_shots.append((cell, result_code(is_hit)))
+        if game.game_over():
+            break
+        turn = 1 - turn
+
+    if log is not None:
+        log.append(GameRecord(seed, grid_a.size, tuple(grid_a.placements),
+                              tuple(grid_b.placements), tuple(logged_shots)))
+    return GameResult(seed, "ab"[turn], shots[0], shots[1])
+
+
+def simulate(n_games, strategy_a=RandomStrategy, strategy_b=RandomStrategy,
+             difficulty="easy", seed=None, log=None, first=0, backend=PYTHON):
+    """Play n_games headless games and return the list of GameResults.
+
+    Game i of a master seed has the seed derive_seed(seed, i), so any single
+    game can be replayed with play_game(..., seed=result.seed), and runs
+    split across workers by index play the same games as a single run.
+
+    :param log: Optional gamelog.GameLogWriter every game is appended to.
+    :param first: Index of the first game to play.
+    :param backend: Random number backend of rngstreams.py.
+    """
+    seed = master_seed(seed)
+    results = []
+    for index in range(first, first + n_games):
+        results.append(play_game(strategy_a, strategy_b, difficulty,
+                                 derive_seed(seed, index), log, backend))
+    return results
+
+
+def parse_board(difficulty, fleet=None):
+    """Returns the BoardConfig for command line options: a difficulty name or
+    a custom size such as "30x30", and optionally a comma-separated list of
+    ship lengths such as "2,3,3,4,5". Raises ValueError for anything else.
+    """
+    name = difficulty.lower()
+    if name in DIFFICULTIES:
+        size = DIFFICULTIES[name].size
+    else:
+        size, _, other = name.partition("x")
+        if not (size.isdigit() and size == other):
+            raise ValueError("Unknown difficulty: " + difficulty)
+        size = int(size)
+        name = None
+    if fleet is None:
+        return DIFFICULTIES[name] if name else board_config(difficulty)
+    return BoardConfig(size,
+                       [int(ship_size) for ship_size in fleet.split(",")],
+                       name)
+
+
+def add_board_arguments(parser):
+    """Adds the --difficulty and --fleet options read by parse_board"""
+    parser.add_argument("--difficulty", default="easy",
+                        help="easy, medium, hard or a custom size such as "
+                             "30x30 (default: easy)")
+    parser.add_argument("--fleet", default=None,
+                        help="Comma-separated ship lengths (default: "
+                             "2,3,3,4,5)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run headless self-play games.")
+    parser.add_argument("--games", type=int, default=1000)
+    add_board_arguments(parser)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--first", type=int, default=0,
+                        help="Index of the first game of the seed to play")
+    parser.add_argument("--rng", default=PYTHON, choices=BACKENDS,
+                        help="Random number backend (default: python)")
+    parser.add_argument("--strategy-a", default="random",
+                        choices=sorted(STRATEGIES))
+    parser.add_argument("--strategy-b", default="random",
+                        choices=sorted(STRATEGIES))
+    parser.add_argument("--log", help="Append every game to this game log")
+    args = parser.parse_args()
+    try:
+        config = parse_board(args.difficulty, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+
+    start = time.perf_counter()
+    if args.log:
+        with GameLogWriter(args.log) as log:
+            results = simulate(args.games, STRATEGIES[args.strategy_a],
+                               STRATEGIES[args.strategy_b], config, args.seed,
+                               log, args.first, args.rng)
+    else:
+        results = simulate(args.games, STRATEGIES[args.strategy_a],
+                           STRATEGIES[args.strategy_b], config, args.seed,
+                           first=args.first, backend=args.rng)
+    elapsed = time.perf_counter() - start
+
+    wins_a = sum(1 for result in results if result.winner == "a")
+    winning_shots = [result.shots_a if result.winner == "a" else result.shots_b
+                     for result in results]
+    print("Games played:", len(results))
+    print("Player a win rate: %.3f" % (wins_a / len(results)))
+    print("Mean shots to win: %.2f" % (sum(winning_shots) / len(results)))
+    print("Games per minute: %.0f" % (len(results) / elapsed * 60))
+
+
+if __name__ == '__main__':
+    main()
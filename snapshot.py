@@ -0,0 +1,332 @@
+"""Snapshot and restore of a game in progress, and an on-disk store of
+suspended games.
+
+A snapshot holds everything needed to carry on a game: each player's grid
+with its ships, the hits and misses marked on it and the ship cells already
+struck, an optional target grid (the console game's view of the opponent),
+and each player's guesses in order. All values are little-endian:
+
+    u8   format version (1)
+    u8   flags: 1 if a target grid is included, 2 if the game is verbose
+    grid of the human player, grid of the computer player, target grid
+    per player (human, then computer):
+        u16  number of guesses
+        u16  cell of each guess
+
+    grid:
+        u8   board size (at most 100)
+        u8   1 if the grid is verbose, else 0
+        u16  number of ships in the fleet
+        u8   length of each ship in the fleet
+        u16  number of ships placed
+        per ship placed:
+            u8   ship size
+            u16  first cell << 1 | 1 if vertical
+        hits, misses, struck: one bit per cell each, size * size bits
+            rounded up to whole bytes
+
+Cells are numbered row * size + col, as in Grid.cell. A hard game forty
+turns in takes about 500 bytes with its target grid.
+"""
+import mmap
+import os
+import struct
+import sys
+
+from main import VALID, Game, Grid, Player, fleet_config
+
+VERSION = 1
+
+TARGET_GRID, VERBOSE = 1, 2
+
+_HEADER = struct.Struct("<BB")
+_GRID = struct.Struct("<BBH")
+_SHIP = struct.Struct("<BH")
+_COUNT = struct.Struct("<H")
+# Index file entry: key, offset and length of the snapshot in the data file.
+# A length of 0 marks a deleted key
+_ENTRY = struct.Struct("<QQI")
+
+
+def _struck_mask(grid):
+    """Returns the mask of ship cells is_hit has already taken out of the
+    grid's ship index. These are not always the cells marked as hits: the
+    console game marks the shots at the computer on the target grid instead.
+    """
+    mask = 0
+    ship_index = grid.ship_index
+    for start, ship_size, direction in grid.placements:
+        step = 1 if direction == "h" else grid.size
+        for cell in range(start, start + ship_size * step, step):
+            if not ship_index[cell]:
+                mask |= 1 << cell
+    return mask
+
+
+def _encode_grid(grid, parts):
+    size = grid.size
+    fleet = grid.config.fleet
+    parts.append(_GRID.pack(size, grid.verbose, len(fleet)))
+    parts.append(bytes(fleet))
+    parts.append(_COUNT.pack(len(grid.placements)))
+    for start, ship_size, direction in grid.placements:
+        parts.append(_SHIP.pack(ship_size, start << 1 | (direction == "v")))
+    nbytes = (size * size + 7) // 8
+    for mask in (grid.hits, grid.misses, _struck_mask(grid)):
+        parts.append(mask.to_bytes(nbytes, "little"))
+
+
+def _decode_grid(data, offset):
+    """Returns the grid encoded at offset and the offset just past it"""
+    size, verbose, ships = _GRID.unpack_from(data, offset)
+    offset += _GRID.size
+    config = fleet_config(size, tuple(data[offset:offset + ships]))
+    offset += ships
+    grid = Grid(config, verbose=False)
+
+    (placed,) = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    for ship in range(placed):
+        ship_size, packed = _SHIP.unpack_from(data, offset)
+        offset += _SHIP.size
+        if grid.place_ship_at(ship_size, packed >> 1,
+                              "v" if packed & 1 else "h") != VALID:
+            raise ValueError("Ship %d in the snapshot cannot be placed"
+                             % ship)
+
+    nbytes = (size * size + 7) // 8
+    masks = []
+    for _ in range(3):
+        masks.append(int.from_bytes(data[offset:offset + nbytes], "little"))
+        offset += nbytes
+    grid.hits, grid.misses, struck = masks
+    # Striking the cells again brings the ship lists and hit counters to
+    # where they were
+    while struck:
+        low = struck & -struck
+        grid.is_hit(low.bit_length() - 1, "computer_player")
+        struck ^= low
+    grid.rendered_rows = None
+    grid.verbose = bool(verbose)
+    return grid, offset
+
+
+def _encode_guesses(player, parts):
+    cells = player.guesses
+    parts.append(_COUNT.pack(len(cells)))
+    parts.append(struct.pack("<%dH" % len(cells), *cells))
+
+
+def _decode_guesses(data, offset, grid):
+    """Returns a Player for grid with the guesses encoded at offset, and the
+    offset just past them
+    """
+    (count,) = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    player = Player(grid)
+    # Same state as calling guess_coord for each guess; the untried pool is
+    # rebuilt from the guesses in order if it is ever needed
+    player.guesses.frombytes(data[offset:offset + 2 * count])
+    if sys.byteorder == "big":
+        player.guesses.byteswap()
+    guessed = player.guessed
+    for cell in player.guesses:
+        guessed[cell] = 1
+    return player, offset + 2 * count
+
+
+def snapshot(game, target_grid=None):
+    """Returns the bytes of a snapshot of game, and of the target grid if
+    one is given
+    """
+    flags = (TARGET_GRID if target_grid is not None else 0) | \
+        (VERBOSE if game.verbose else 0)
+    parts = [_HEADER.pack(VERSION, flags)]
+    _encode_grid(game.human_player.grid, parts)
+    _encode_grid(game.computer_player.grid, parts)
+    if target_grid is not None:
+        _encode_grid(target_grid, parts)
+    _encode_guesses(game.human_player, parts)
+    _encode_guesses(game.computer_player, parts)
+    return b"".join(parts)
+
+
+def restore(data):
+    """Rebuilds a game from a snapshot. Returns (game, target_grid), with
+    target_grid None if the snapshot has none. Raises ValueError if a ship of
+    the snapshot cannot be placed, e.g. on top of another.
+
+    :param data: Any bytes-like object, e.g. a slice of a memory map.
+    """
+    version, flags = _HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError("Unsupported snapshot version: %d" % version)
+    offset = _HEADER.size
+    human_grid, offset = _decode_grid(data, offset)
+    computer_grid, offset = _decode_grid(data, offset)
+    target_grid = None
+    if flags & TARGET_GRID:
+        target_grid, offset = _decode_grid(data, offset)
+    human_player, offset = _decode_guesses(data, offset, human_grid)
+    computer_player, offset = _decode_guesses(data, offset, computer_grid)
+    game = Game(human_player, computer_player,
+                verbose=bool(flags & VERBOSE))
+    return game, target_grid
+
+
+def guess_results(player, target_grid):
+    """Returns (cell, is_hit) for each of player's guesses at target_grid,
+    in order, with is_hit as Grid.is_hit returned it at the time. Feeding
+    them to a new strategy's record() brings it back to where it was.
+    """
+    size = target_grid.size
+    placements = target_grid.placements
+    ship_at = {}
+    hits_left = []
+    for ship_id, (start, ship_size, direction) in enumerate(placements):
+        step = 1 if direction == "h" else size
+        for cell in range(start, start + ship_size * step, step):
+            ship_at[cell] = ship_id
+        hits_left.append(ship_size)
+
+    results = []
+    for cell in player.guesses:
+        ship_id = ship_at.pop(cell, None)
+        if ship_id is None:
+            results.append((cell, None))
+            continue
+        hits_left[ship_id] -= 1
+        results.append((cell, 0 if hits_left[ship_id]
+                        else placements[ship_id][1]))
+    return results
+
+
+class MatchStore:
+    """Suspended games on disk, keyed by integer ids below 2**64.
+
+    Snapshots are appended to a data file and their offsets to an index file
+    next to it (path + ".idx"), which is read into a dict when the store is
+    opened. Reads slice a memory map of the data file, so restoring one game
+    out of hundreds of thousands costs one dict lookup plus restore().
+    Replaced and deleted snapshots stay in the data file until compact().
+
+    Use as a context manager:
+        with MatchStore("matches.db") as store:
+            store.put(match_id, game)
+            game, target_grid = store.get(match_id)
+    """
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        # Key -> (offset, length) of its snapshot in the data file
+        index_path = path + ".idx"
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as index_file:
+                entries = index_file.read()
+            # The last entry for a key wins
+            for key, offset, length in _ENTRY.iter_unpack(
+                    entries[:len(entries) - len(entries) % _ENTRY.size]):
+                if length:
+                    self.index[key] = (offset, length)
+                else:
+                    self.index.pop(key, None)
+        self.data_file = open(path, "ab")
+        self.index_file = open(index_path, "ab")
+        self.end = self.data_file.tell()
+        self.map = None
+        self.mapped = 0
+        # Bytes of the data file covered by self.map
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def keys(self):
+        return self.index.keys()
+
+    def put(self, key, game, target_grid=None):
+        """Stores a snapshot of game under key, replacing any earlier one"""
+        data = snapshot(game, target_grid)
+        self.data_file.write(data)
+        # The snapshot reaches the file before its index entry can, so after
+        # a crash the index never points past the end of the data
+        self.data_file.flush()
+        self.index_file.write(_ENTRY.pack(key, self.end, len(data)))
+        self.index[key] = (self.end, len(data))
+        self.end += len(data)
+
+    def get_bytes(self, key):
+        """Returns the snapshot stored under key, or None"""
+        location = self.index.get(key)
+        if location is None:
+            return None
+        offset, length = location
+        if offset + length > self.mapped:
+            self.__remap()
+        return self.map[offset:offset + length]
+
+    def get(self, key):
+        """Restores the game stored under key. Returns (game, target_grid),
+        or None if there is no such key.
+        """
+        data = self.get_bytes(key)
+        return None if data is None else restore(data)
+
+    def delete(self, key):
+        """Removes key from the store. Returns False if it was not there"""
+        if self.index.pop(key, None) is None:
+            return False
+        self.index_file.write(_ENTRY.pack(key, 0, 0))
+        return True
+
+    def __remap(self):
+        """Maps the whole data file, after writing out buffered snapshots"""
+        self.data_file.flush()
+        if self.map is not None:
+            self.map.close()
+        with open(self.path, "rb") as data_file:
+            self.map = mmap.mmap(data_file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        self.mapped = len(self.map)
+
+    def flush(self):
+        self.data_file.flush()
+        self.index_file.flush()
+
+    def compact(self):
+        """Rewrites the data and index files with only the live snapshots"""
+        snapshots = [(key, self.get_bytes(key)) for key in self.index]
+        self.close()
+        index = {}
+        offset = 0
+        with open(self.path + ".tmp", "wb") as data_file, \
+                open(self.path + ".idx.tmp", "wb") as index_file:
+            for key, data in snapshots:
+                data_file.write(data)
+                index_file.write(_ENTRY.pack(key, offset, len(data)))
+                index[key] = (offset, len(data))
+                offset += len(data)
+        os.replace(self.path + ".tmp", self.path)
+        os.replace(self.path + ".idx.tmp", self.path + ".idx")
+        self.index = index
+        self.data_file = open(self.path, "ab")
+        self.index_file = open(self.path + ".idx", "ab")
+        self.end = offset
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+            self.mapped = 0
+        if self.data_file is not None:
+            self.data_file.close()
+            self.index_file.close()
+            self.data_file = self.index_file = None
@@ -0,0 +1,28 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from batch import BoardBatch  # noqa: E402
+
+
+def assert_fleets_whole(batch, fleet):
+    ship_id = batch.ship_id.reshape(batch.games, -1)
+    for ship, ship_size in enumerate(fleet):
+        assert ((ship_id == ship + 1).sum(axis=1) == ship_size).all()
+
+
+def test_crowded_fleet_is_placed_whole():
+    fleet = [3] * 11
+    batch = BoardBatch(500, 6, fleet, np.random.default_rng(1))
+    assert_fleets_whole(batch, fleet)
+
+
+def test_fleets_over_127_ships():
+    fleet = [2] * 200
+    batch = BoardBatch(3, 30, fleet, np.random.default_rng(2))
+    assert_fleets_whole(batch, fleet)
+
+
+def test_unpackable_fleet_raises():
+    with pytest.raises(ValueError):
+        BoardBatch(10, 5, [5, 5, 5, 3, 3, 3], np.random.default_rng(3))
@@ -0,0 +1,27 @@
+import pytest
+
+from fleets import SEQUENTIAL, UNIFORM, FleetSampler, placement_code
+from main import BoardConfig
+
+UNPACKABLE = BoardConfig(5, [5, 5, 5, 3, 3, 3])
+
+
+@pytest.mark.parametrize("method", [UNIFORM, SEQUENTIAL])
+def test_unpackable_fleet_raises(method):
+    with pytest.raises(ValueError):
+        FleetSampler(UNPACKABLE, method, seed=1).sample()
+
+
+def test_unpackable_fleet_raises_in_arrays():
+    pytest.importorskip("numpy")
+    with pytest.raises(ValueError):
+        FleetSampler(UNPACKABLE, seed=1).sample_array(10)
+
+
+def test_boards_over_127_ships():
+    pytest.importorskip("numpy")
+    sampler = FleetSampler(BoardConfig(30, [2] * 200), SEQUENTIAL, seed=2)
+    fleet = sampler.sample()
+    boards = sampler.boards([[placement_code(start, direction)
+                              for start, _, direction in fleet]])
+    assert sorted(set(boards.ravel().tolist())) == list(range(201))
@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from ai import DensityStrategy
+from gamelog import (GameLogWriter, GameRecord, decode, encode, read_log,
+                     replay)
+from main import BoardConfig, Grid
+from simulation import RandomStrategy, simulate
+
+
+def test_log_roundtrip_and_replay(tmp_path):
+    path = str(tmp_path / "games.log")
+    with GameLogWriter(path) as log:
+        results = simulate(5, DensityStrategy, RandomStrategy, "medium", 3,
+                           log)
+    records = list(read_log(path))
+    assert [record.seed for record in records] == \
+        [result.seed for result in results]
+    for record, result in zip(records, results):
+        assert decode(encode(record)[4:]) == record
+        grid_a, grid_b = replay(record)
+        winner = grid_a if result.winner == "a" else grid_b
+        loser = grid_b if result.winner == "a" else grid_a
+        assert loser.ships_left == 0 and winner.ships_left > 0
+
+
+def test_fleets_over_255_ships():
+    config = BoardConfig(40, [2] * 300)
+    grids = [Grid(config, verbose=False).place_random_fleet(
+        random.Random(seed)) for seed in range(2)]
+    record = GameRecord(None, 40, tuple(grids[0].placements),
+                        tuple(grids[1].placements), ((0, 0), (1, 0)))
+    assert decode(encode(record)[4:]) == record
+
+
+def test_replay_rejects_overlapping_ships():
+    record = GameRecord(None, 8, ((0, 2, "h"), (1, 2, "v")),
+                        ((0, 2, "h"), (8, 2, "h")), ())
+    with pytest.raises(ValueError):
+        replay(record)
@@ -0,0 +1,46 @@
+import random
+
+from gamestate import GameState
+from main import Grid
+
+
+def state_of(state):
+    return (state.shot_cells(), bytes(state.shot), bytes(state.hits_left),
+            state.ships_left, state.cells_left)
+
+
+def test_apply_shot_matches_grid_and_undo_restores():
+    rng = random.Random(11)
+    grid = Grid("medium", verbose=False).place_random_fleet(rng)
+    cells = list(range(grid.config.cells))
+    rng.shuffle(cells)
+    state = GameState.from_grid(grid)
+    before = []
+    for cell in cells:
+        before.append(state_of(state))
+        assert state.apply_shot(cell) == grid.is_hit(cell, "computer_player")
+        assert (state.ships_left, state.cells_left) == \
+            (grid.ships_left, grid.cells_left)
+    assert state.game_over()
+    for cell in reversed(cells):
+        assert state.undo_shot() == cell
+        assert state_of(state) == before.pop()
+    assert state.shot_cells() == [] and state.ships_left == 5
+
+
+def test_clones_are_independent():
+    grid = Grid("hard", verbose=False).place_random_fleet(random.Random(4))
+    shots = list(range(0, 225, 7))
+    state = GameState.from_grid(grid, shots)
+    start = state_of(state)
+    clone = state.clone()
+    grandchild = clone.clone()
+    clone.apply_shot(1)
+    clone.apply_shot(2)
+    assert state_of(state) == start == state_of(grandchild)
+    state.undo_shot()
+    assert state_of(grandchild) == start
+    assert clone.shot_cells() == shots + [1, 2]
+    clone.undo_shot()
+    clone.undo_shot()
+    assert state_of(clone) == start
@@ -0,0 +1,19 @@
+import pytest
+
+from main import Grid, Player
+
+
+@pytest.mark.parametrize("cell", [-1, -64, 64, 1000])
+def test_cell_ids_off_the_board_are_rejected(cell):
+    grid = Grid("easy", verbose=False)
+    grid.place_ship_at(2, 62, "h")  # Covers the last cell, 63
+    player = Player(Grid("easy", verbose=False))
+    with pytest.raises(ValueError):
+        player.guess_coord(cell)
+    with pytest.raises(ValueError):
+        grid.is_hit(cell, "computer_player")
+    with pytest.raises(ValueError):
+        grid.mark_hit_or_miss(cell, None, "computer_player")
+    assert not player.has_guessed(cell)
+    assert not player.guessed[-1]
+    assert grid.cells_left == 2
@@ -0,0 +1,23 @@
+import random
+from functools import partial
+
+import pytest
+
+from main import Grid, Player
+from mcts import MCTSStrategy
+from simulation import RandomStrategy, play_game
+
+
+def test_iteration_limited_search_finishes_a_game():
+    strategy = partial(MCTSStrategy, move_time=None, iterations=20)
+    result = play_game(strategy, RandomStrategy, "easy", 5)
+    assert result.winner == "a"
+    assert result.shots_a <= 64
+    again = play_game(strategy, RandomStrategy, "easy", 5)
+    assert again == result
+
+
+def test_search_without_a_budget_is_rejected():
+    player = Player(Grid("easy", verbose=False))
+    with pytest.raises(ValueError):
+        MCTSStrategy(player, random.Random(1), move_time=None)
@@ -0,0 +1,23 @@
+import random
+
+import pytest
+
+from main import BoardConfig, Grid, place_ship
+
+
+def test_crowded_fleet_is_placed_whole():
+    config = BoardConfig(6, [3] * 11)
+    for seed in range(50):
+        grid = Grid(config, verbose=False).place_random_fleet(
+            random.Random(seed))
+        assert list(grid.ship_sizes) == [3] * 11
+        assert grid.cells_left == 33
+        assert bin(grid.occupied).count("1") == 33
+
+
+def test_computer_place_ship_raises_when_out_of_room():
+    grid = Grid(BoardConfig(2, [2, 2]), verbose=False)
+    grid.place_ship_at(2, 0, "v")
+    grid.place_ship_at(2, 1, "v")
+    with pytest.raises(ValueError):
+        place_ship("2x1", grid, "computer_player", grid.config)
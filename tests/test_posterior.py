@@ -0,0 +1,65 @@
+import itertools
+
+import pytest
+
+from main import legal_placements
+from posterior import PosteriorEngine, position
+
+# Tiny positions: (size, remaining, hits, misses, sunk) as cell lists
+POSITIONS = [
+    (4, (3, 2), [], [], []),
+    (4, (3, 2, 2), [5], [0, 6], []),
+    (5, (3, 2), [7, 12], [6], [0, 1]),
+    (5, (4, 3, 2), [11], [10, 16, 24], []),
+]
+
+
+def mask(cells):
+    return sum(1 << cell for cell in cells)
+
+
+def brute_force(size, remaining, hits, misses, sunk):
+    """Probabilities by trying every placement of every ship"""
+    allowed = ((1 << size * size) - 1) & ~(misses | sunk)
+    counts = [0] * (size * size)
+    total = 0
+    choices = [[placement for placement, _, _ in
+                legal_placements(size, ship_size)
+                if not placement & ~allowed and placement & ~hits]
+               for ship_size in remaining]
+    for fleet in itertools.product(*choices):
+        occupied = 0
+        for placement in fleet:
+            if occupied & placement:
+                break
+            occupied |= placement
+        else:
+            if hits & ~occupied:
+                continue
+            total += 1
+            for cell in range(size * size):
+                counts[cell] += occupied >> cell & 1
+    known = hits | sunk
+    return [1.0 if known >> cell & 1 else
+            0.0 if misses >> cell & 1 else counts[cell] / total
+            for cell in range(size * size)]
+
+
+@pytest.mark.parametrize("size,remaining,hits,misses,sunk", POSITIONS)
+def test_exact_matches_brute_force(size, remaining, hits, misses, sunk):
+    hits, misses, sunk = mask(hits), mask(misses), mask(sunk)
+    expected = brute_force(size, remaining, hits, misses, sunk)
+    engine = PosteriorEngine(exact_limit=10 ** 6, seed=1)
+    result = engine.exact(position(size, remaining, hits, misses, sunk))
+    assert result == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("size,remaining,hits,misses,sunk", POSITIONS)
+def test_samples_converge_to_brute_force(size, remaining, hits, misses,
+                                         sunk):
+    hits, misses, sunk = mask(hits), mask(misses), mask(sunk)
+    expected = brute_force(size, remaining, hits, misses, sunk)
+    engine = PosteriorEngine(samples=20000, exact_limit=0, seed=1)
+    result = engine.probabilities(
+        position(size, remaining, hits, misses, sunk))
+    assert result == pytest.approx(expected, abs=0.03)
@@ -0,0 +1,26 @@
+import pickle
+
+import pytest
+
+from rngstreams import BlockRandom
+
+pytest.importorskip("numpy")
+
+
+def draws(rng):
+    return [rng.random() for _ in range(20)] + \
+        [rng.getrandbits(70) for _ in range(20)] + \
+        [rng.randrange(1000) for _ in range(20)]
+
+
+def test_block_random_state_roundtrip():
+    rng = BlockRandom(5, block=8)
+    for _ in range(13):
+        rng.random()
+    rng.getrandbits(100)
+    state = rng.getstate()
+    copy = pickle.loads(pickle.dumps(rng))
+    expected = draws(rng)
+    assert draws(copy) == expected
+    rng.setstate(state)
+    assert draws(rng) == expected
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from main import Game, Grid, Player
+from snapshot import MatchStore, guess_results, restore, snapshot
+
+
+def grid_state(grid):
+    return (grid.config, grid.verbose, grid.placements, grid.hits,
+            grid.misses, list(grid.ship_index), list(grid.ship_hits_left),
+            grid.ships_left, grid.cells_left)
+
+
+def player_state(player):
+    return (list(player.guesses), bytes(player.guessed),
+            grid_state(player.grid))
+
+
+def game_in_progress(difficulty, seed, turns):
+    """Returns a game and a target grid after turns random shots a side.
+    The computer's shots are marked on the human grid and the human's on the
+    target grid, as in the console game.
+    """
+    rng = random.Random(seed)
+    human = Player(Grid(difficulty, verbose=False).place_random_fleet(rng))
+    computer = Player(Grid(difficulty, verbose=False).place_random_fleet(rng))
+    target_grid = Grid(difficulty, verbose=False)
+    for _ in range(turns):
+        cell = human.guess_coord(human.random_untried(rng))
+        target_grid.mark_hit_or_miss(
+            cell, computer.grid.is_hit(cell, "computer_player"),
+            "computer_player")
+        cell = computer.guess_coord(computer.random_untried(rng))
+        human.grid.mark_hit_or_miss(
+            cell, human.grid.is_hit(cell, "human_player"), "human_player")
+    return Game(human, computer, verbose=False), target_grid
+
+
+def test_snapshot_roundtrip():
+    for difficulty in ("easy", "hard", "30x30"):
+        game, target_grid = game_in_progress(difficulty, 7, 25)
+        data = snapshot(game, target_grid)
+        restored, restored_target = restore(data)
+        assert player_state(restored.human_player) == \
+            player_state(game.human_player)
+        assert player_state(restored.computer_player) == \
+            player_state(game.computer_player)
+        assert grid_state(restored_target) == grid_state(target_grid)
+        assert snapshot(restored, restored_target) == data
+
+
+def test_guess_results_match_the_shots():
+    game, _ = game_in_progress("medium", 3, 40)
+    target = Grid("medium", verbose=False)
+    for start, ship_size, direction in game.computer_player.grid.placements:
+        target.place_ship_at(ship_size, start, direction)
+    expected = [(cell, target.is_hit(cell, "computer_player"))
+                for cell in game.human_player.guesses]
+    assert guess_results(game.human_player, game.computer_player.grid) == \
+        expected
+
+
+def test_match_store_survives_compact_and_reopen(tmp_path):
+    path = str(tmp_path / "matches.db")
+    games = {key: game_in_progress("medium", key, key)[0]
+             for key in range(1, 6)}
+    with MatchStore(path) as store:
+        for key, game in games.items():
+            store.put(key, game)
+        store.delete(2)
+        store.put(3, games[5])
+        assert store.get(2) is None
+        store.compact()
+    with MatchStore(path) as store:
+        assert sorted(store.keys()) == [1, 3, 4, 5]
+        for key, expected in ((1, games[1]), (3, games[5]), (4, games[4])):
+            assert snapshot(store.get(key)[0]) == snapshot(expected)
+
+
+def test_restore_rejects_overlapping_ships():
+    game, _ = game_in_progress("easy", 5, 0)
+    data = bytearray(snapshot(game))
+    # Header, grid header, fleet and ship count come before the first ship;
+    # give the second ship the first one's placement
+    first = 2 + 4 + len(game.human_player.grid.config.fleet) + 2
+    data[first + 3:first + 6] = data[first:first + 3]
+    with pytest.raises(ValueError):
+        restore(bytes(data))
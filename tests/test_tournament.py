@@ -0,0 +1,12 @@
+from simulation import STRATEGIES, RandomStrategy
+from tournament import merge, play_shard
+
+
+def test_mirrored_pairs_split_equal_strategies_evenly(monkeypatch):
+    monkeypatch.setitem(STRATEGIES, "random2", RandomStrategy)
+    result = merge([play_shard("random", "random2", "easy", 40, 7),
+                    play_shard("random", "random2", "easy", 40, 7, 40)])
+    assert result.games == 80
+    assert result.wins["random"] == result.wins["random2"] == 40
+    assert result.shots["random"] == result.shots["random2"]
+
@@ -0,0 +1,189 @@
+"""Multi-core tournament runner for computer strategies.
+
+Plays every pair of strategies against each other, sharding the games across
+a process pool. Every pairing has a seed derived from the master seed, and a
+shard plays a fixed range of that pairing's game indices (see rngstreams.py),
+so the results are the same for a given master seed no matter how many
+worker processes are used, and any game can be replayed on its own.
+
+Games come in mirrored pairs: games 2k and 2k + 1 are both played on game
+seed k of the pairing, with the other strategy shooting first, so neither
+strategy gains from moving first and two equal strategies come out even.
+
+Usage:
+    python tournament.py --games 20000 --difficulty medium --seed 1 \
+        random density
+"""
+import argparse
+import math
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from rngstreams import BACKENDS, PYTHON, derive_seed, master_seed
+from simulation import STRATEGIES, add_board_arguments, parse_board, play_game
+
+SHARD_SIZE = 500
+# Even, so that both games of a mirrored pair fall in the same shard
+
+# Merged results of one shard or of a whole pairing. wins maps each strategy
+# name to its number of wins, and shots maps each name to a Counter of the
+# number of shots it took to win.
+ShardResult = namedtuple("ShardResult", ["games", "wins", "shots"])
+
+
+def play_shard(name_a, name_b, difficulty, n_games, seed, first_game=0,
+               backend=PYTHON):
+    """Plays games first_game to first_game + n_games of a pairing's seed
+    between two named strategies: name_a shoots first in the even games and
+    name_b in the odd ones, each odd game replaying the seed of the even game
+    before it. Strategies are passed by name so that only plain data crosses
+    process boundaries.
+    """
+    wins = Counter({name_a: 0, name_b: 0})
+    shots = {name_a: Counter(), name_b: Counter()}
+    for game in range(first_game, first_game + n_games):
+        first, second = (name_a, name_b) if game % 2 == 0 \
+            else (name_b, name_a)
+        result = play_game(STRATEGIES[first], STRATEGIES[second], difficulty,
+                           derive_seed(seed, game // 2), backend=backend)
+        if result.winner == "a":
+            wins[first] += 1
+            shots[first][result.shots_a] += 1
+        else:
+            wins[second] += 1
+            shots[second][result.shots_b] += 1
+    return ShardResult(n_games, wins, shots)
+
+
+def merge(shard_results):
+    """Combines shard results of the same pairing"""
+    games = 0
+    wins = Counter()
+    shots = {}
+    for shard in shard_results:
+        games += shard.games
+        wins.update(shard.wins)
+        for name, counts in shard.shots.items():
+            shots.setdefault(name, Counter()).update(counts)
+    return ShardResult(games, wins, shots)
+
+
+def wilson_interval(wins, games, z=1.96):
+    """95% Wilson score confidence interval of a win rate"""
+    if games == 0:
+        return 0.0, 0.0
+    rate = wins / games
+    centre = (rate + z * z / (2 * games)) / (1 + z * z / games)
+    margin = z * math.sqrt(rate * (1 - rate) / games
+                           + z * z / (4 * games * games)) / (1 + z * z / games)
+    return centre - margin, centre + margin
+
+
+def percentile(counts, fraction):
+    """Returns the given percentile (0 to 1) of a Counter of values"""
+    total = sum(counts.values())
+    seen = 0
+    for value in sorted(counts):
+        seen += counts[value]
+        if seen >= fraction * total:
+            return value
+    return None
+
+
+def summarize(result, name):
+    """Returns a dict of statistics for one strategy of a merged pairing"""
+    counts = result.shots[name]
+    wins = result.wins[name]
+    mean = sum(value * n for value, n in counts.items()) / wins if wins \
+        else None
+    if wins > 1:
+        variance = sum(n * (value - mean) ** 2
+                       for value, n in counts.items()) / (wins - 1)
+        margin = 1.96 * math.sqrt(variance / wins)
+        mean_interval = (mean - margin, mean + margin)
+    else:
+        mean_interval = None
+    return {
+        "wins": wins,
+        "win_rate": wins / result.games,
+        "win_rate_ci": wilson_interval(wins, result.games),
+        "mean_shots": mean,
+        "mean_shots_ci": mean_interval,
+        "p50_shots": percentile(counts, 0.5),
+        "p95_shots": percentile(counts, 0.95),
+    }
+
+
+def run_tournament(names, n_games, difficulty="easy", seed=None,
+                   workers=None, backend=PYTHON):
+    """Plays n_games between every pair of named strategies, in mirrored
+    pairs of games (an odd n_games leaves the last game unpaired). Returns a
+    dict mapping each (name_a, name_b) pair to its merged ShardResult.
+
+    :param workers: Number of worker processes. Defaults to one per core.
+    :param backend: Random number backend of rngstreams.py.
+    """
+    seed = master_seed(seed)
+    pairings = list(combinations(names, 2))
+    jobs = []
+    for pairing, (name_a, name_b) in enumerate(pairings):
+        for start in range(0, n_games, SHARD_SIZE):
+            jobs.append((name_a, name_b, difficulty,
+                         min(SHARD_SIZE, n_games - start),
+                         derive_seed(seed, pairing), start, backend))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_shard, *job) for job in jobs]
+        shard_results = [future.result() for future in futures]
+
+    results = {}
+    for pairing in pairings:
+        results[pairing] = merge(shard for job, shard
+                                 in zip(jobs, shard_results)
+                                 if job[:2] == pairing)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare computer "
+                                                 "strategies.")
+    parser.add_argument("strategies", nargs="*", default=sorted(STRATEGIES),
+                        help="Strategy names (default: all)")
+    parser.add_argument("--games", type=int, default=10000,
+                        help="Games per pairing")
+    add_board_arguments(parser)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rng", default=PYTHON, choices=BACKENDS,
+                        help="Random number backend (default: python)")
+    args = parser.parse_args()
+
+    try:
+        config = parse_board(args.difficulty, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+    unknown = set(args.strategies) - set(STRATEGIES)
+    if unknown or len(set(args.strategies)) != len(args.strategies) or \
+            len(args.strategies) < 2:
+        parser.error("choose at least two different strategies from: "
+                     + ", ".join(sorted(STRATEGIES)))
+
+    results = run_tournament(args.strategies, args.games, config, args.seed,
+                             args.workers, args.rng)
+    for (name_a, name_b), result in results.items():
+        print("%s vs %s (%d games)" % (name_a, name_b, result.games))
+        for name in (name_a, name_b):
+            stats = summarize(result, name)
+            print("  %-8s win rate %.3f [%.3f, %.3f]"
+                  % ((name, stats["win_rate"]) + stats["win_rate_ci"]),
+                  end="")
+            if stats["mean_shots"] is not None:
+                print("  shots to win: mean %.2f, p50 %d, p95 %d"
+                      % (stats["mean_shots"], stats["p50_shots"],
+                         stats["p95_shots"]), end="")
+            print("")
+
+
+if __name__ == '__main__':
+    main()